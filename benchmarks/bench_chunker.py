@@ -0,0 +1,94 @@
+"""Benchmark: byte-budget chunker vs. the character-based splitter it replaced.
+
+Run from the repository root:
+
+    python benchmarks/bench_chunker.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_chunker import split_by_bytes, utf8_len
+
+MAX_BYTES = 500  # MyMemory's request limit
+
+PARAGRAPHS = {
+    "english": "The server will be down for maintenance tonight. Please save your progress before 10pm UTC. "
+               "We will post an update in the announcements channel once everything is back online.\n",
+    "arabic": "تم تحديث السيرفر اليوم. يرجى قراءة القوانين الجديدة في قناة الإعلانات قبل المشاركة في الحدث؟ "
+              "شكرا لكم جميعا على الصبر والدعم المستمر خلال فترة الصيانة.\n",
+    "japanese": "今日はサーバーのメンテナンスがあります。作業の前に進行状況を保存してください！"
+                "メンテナンスが終わったらお知らせチャンネルで連絡します。\n",
+    "unpunctuated": "lol yeah we were all there the whole night and nobody even noticed the boss had respawned "
+                    "until it was way too late and then everyone just kind of panicked and ran ",
+}
+
+SIZES = [2_000, 20_000, 200_000]
+
+
+def split_baseline(text, max_length=400):
+    """The splitter used before byte budgets: characters, '\\n' and '. ' only."""
+    if len(text) <= max_length:
+        return [text]
+
+    chunks = []
+    paragraphs = text.split('\n')
+    current_chunk = ""
+
+    for paragraph in paragraphs:
+        if len(current_chunk + paragraph) <= max_length:
+            current_chunk += paragraph + "\n"
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+                current_chunk = paragraph + "\n"
+            else:
+                sentences = paragraph.split('. ')
+                for sentence in sentences:
+                    if len(current_chunk + sentence) <= max_length:
+                        current_chunk += sentence + ". "
+                    else:
+                        if current_chunk:
+                            chunks.append(current_chunk.strip())
+                        current_chunk = sentence + ". "
+
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+def timed(func, text):
+    rounds = max(1, 200_000 // len(text))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        chunks = func(text)
+    return (time.perf_counter() - started) / rounds, chunks
+
+
+def describe(chunks):
+    sizes = [utf8_len(chunk.strip()) for chunk in chunks]
+    oversized = sum(size > MAX_BYTES for size in sizes)
+    return f"{len(chunks):>5} chunks {max(sizes):>7} B max {oversized:>5} over"
+
+
+def main():
+    print(f"{'text':<14} {'chars':>8}   {'baseline':<44} {'byte budget':<44} {'cost':>8}")
+    for name, paragraph in PARAGRAPHS.items():
+        for size in SIZES:
+            text = (paragraph * (size // len(paragraph) + 1))[:size]
+            baseline_time, baseline_chunks = timed(split_baseline, text)
+            new_time, new_chunks = timed(lambda t: split_by_bytes(t, MAX_BYTES), text)
+            print(
+                f"{name:<14} {size:>8}   "
+                f"{baseline_time * 1e3:8.2f} ms {describe(baseline_chunks):<32} "
+                f"{new_time * 1e3:8.2f} ms {describe(new_chunks):<32} "
+                f"{new_time / baseline_time:7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
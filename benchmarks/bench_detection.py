@@ -0,0 +1,90 @@
+"""Benchmark: tiered script/langdetect detector vs. plain langdetect.
+
+Run from the repository root:
+
+    python benchmarks/bench_detection.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langdetect import detect, LangDetectException
+
+from language_detector import LanguageDetector
+
+# Typical chat messages from our mostly Arabic/English servers, plus other scripts
+SAMPLES = [
+    "السلام عليكم ورحمة الله وبركاته",
+    "مرحبا بالجميع، متى يبدأ الحدث اليوم؟",
+    "تم تحديث السيرفر، يرجى قراءة القوانين الجديدة في قناة الإعلانات",
+    "هههههه والله صح",
+    "شكرا لك يا صديقي على المساعدة",
+    "ممكن أحد يساعدني في المهمة الثالثة؟",
+    "hey guys what's up",
+    "gg everyone, see you tomorrow",
+    "Can someone help me with the third quest please?",
+    "The server will be down for maintenance at 10pm UTC",
+    "lol that was insane",
+    "Hola a todos, ¿cómo están?",
+    "Bonjour tout le monde, le serveur redémarre bientôt",
+    "Привет всем, как дела?",
+    "こんにちは、今日はいい天気ですね",
+    "你们好，今天的活动几点开始？",
+    "안녕하세요 여러분, 오늘 이벤트 몇 시에 시작해요?",
+    "สวัสดีครับทุกคน",
+    "Γεια σας σε όλους",
+    "नमस्ते दोस्तों, आज का कार्यक्रम कब शुरू होगा?",
+]
+
+ROUNDS = 50
+
+
+def detect_baseline(text):
+    """The detector used before the script fast path existed."""
+    try:
+        cleaned_text = re.sub(r'[^\w\s]', ' ', text)
+        cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
+        if len(cleaned_text) < 3:
+            return None
+        return detect(cleaned_text)
+    except LangDetectException:
+        return None
+
+
+def timed(func, samples):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text in samples:
+            func(text)
+    return (time.perf_counter() - started) / (ROUNDS * len(samples))
+
+
+def main():
+    detector = LanguageDetector()
+    # Load langdetect's profiles before timing anything
+    detect_baseline(SAMPLES[0])
+
+    arabic = [text for text in SAMPLES if detector.detect_fast(text)[0] == 'ar']
+    results = [
+        ("all samples", timed(detect_baseline, SAMPLES), timed(detector.detect, SAMPLES)),
+        ("arabic only", timed(detect_baseline, arabic), timed(detector.detect, arabic)),
+    ]
+
+    print(f"{'text':<45} {'langdetect':>10} {'tiered':>8}")
+    for text in SAMPLES:
+        print(f"{text[:45]:<45} {str(detect_baseline(text)):>10} {str(detector.detect(text)):>8}")
+
+    print()
+    print(f"{'':<12} {'langdetect':>12} {'tiered':>12} {'speedup':>8}")
+    for name, baseline, tiered in results:
+        print(f"{name:<12} {baseline * 1e6:9.1f} us {tiered * 1e6:9.1f} us {baseline / tiered:7.1f}x")
+    total = detector.fast_path_hits + detector.langdetect_calls
+    print(f"fast path share: {detector.fast_path_hits / total:8.0%}")
+
+
+if __name__ == "__main__":
+    main()
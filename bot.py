@@ -4,103 +4,270 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+from collections import OrderedDict
 from typing import Optional
 import re
+import time
 
 from translator import Translator
+from translation_scheduler import SchedulerOverloaded, PRIORITY_SPECULATIVE
+from text_chunker import split_by_chars
 from language_manager import LanguageManager
-from config import SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE, MAX_MESSAGE_LENGTH
+from button_expiry import ButtonExpiryScheduler
+from reply_throttle import ChannelReplyThrottle
+from config import (
+    SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE, MAX_MESSAGE_LENGTH, MESSAGE_CACHE_SIZE,
+    BUTTON_COALESCE_WINDOW, BUTTON_COALESCE_MAX,
+    PREFETCH_ENABLED, PREFETCH_ACTIVE_WINDOW, PREFETCH_ACTIVE_USERS, WAIT_NOTICE_INTERVAL,
+    TRANSLATION_PAGE_CHARS, STREAM_EDIT_INTERVAL,
+)
 
-class TranslationView(discord.ui.View):
-    """View containing translation buttons for messages."""
+def translation_pages(text: str) -> list:
+    """Split a message into the pages a translation reply shows, one embed field each."""
+    return [page.strip() for page in split_by_chars(text, TRANSLATION_PAGE_CHARS)]
+
+async def send_translation(interaction: discord.Interaction, channel_id: int, message_id: int, author_id: int,
+                           page: int = 0, edit: bool = False):
+    """
+    Translate one page of a channel message into the clicking user's language and reply privately.
+    Only the page shown is translated; with edit=True the existing reply is turned to that page.
+    """
+    bot = interaction.client
     
-    def __init__(self, original_message: str, author_id: int):
-        super().__init__(timeout=300)  # 5 minutes timeout - shorter to reduce clutter
-        self.original_message = original_message
-        self.author_id = author_id
+    if edit:
+        await interaction.response.defer()
+    else:
+        await interaction.response.defer(ephemeral=True)
     
-    async def on_timeout(self):
-        """Remove buttons when timeout expires."""
-        try:
-            # Disable all buttons
-            for item in self.children:
-                item.disabled = True
-            
-            # Try to edit the message to remove buttons
-            if hasattr(self, 'message') and self.message:
-                await self.message.edit(view=self)
-        except:
-            pass  # Ignore errors if message was deleted or we can't edit
+    # Get user's preferred language
+    user_lang = await bot.language_manager.get_user_language_async(interaction.user.id)
     
-    @discord.ui.button(label="ترجم", style=discord.ButtonStyle.primary, emoji="🌐")
-    async def translate_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Handle translation button click."""
-        bot = interaction.client
-        
-        # Get user's preferred language
-        user_lang = bot.language_manager.get_user_language(interaction.user.id)
+    try:
+        # Fetch the original text only now that someone actually wants it
+        original_message = await bot.get_message_content(channel_id, message_id)
+        if original_message is None:
+            embed = discord.Embed(
+                title="❌ الرسالة غير متوفرة / Message Unavailable",
+                description="الرسالة الأصلية لم تعد متوفرة.\nThe original message is no longer available.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
         
-        await interaction.response.defer(ephemeral=True)
+        # Long messages are shown a page at a time, sized to fit an embed field
+        pages = translation_pages(original_message)
+        page = min(page, len(pages) - 1)
+        page_text = pages[page]
         
+        # Translate the page, showing the first chunks as soon as they are ready
+        stream = bot.translator.translate_stream(page_text, user_lang, author_id=author_id, user_id=interaction.user.id)
         try:
-            # Translate the message
-            translated_text, source_lang = await bot.translator.translate_text(
-                self.original_message, 
-                user_lang
+            translated_text, source_lang, complete = await wait_with_queue_notice(
+                interaction,
+                anext(stream),
+                lambda: bot.translator.estimate_wait(page_text, user_lang)
             )
             
             if not translated_text:
-                embed = discord.Embed(
-                    title="❌ خطأ في الترجمة / Translation Error",
-                    description="عذراً، لا يمكن ترجمة هذه الرسالة.\nSorry, this message cannot be translated.",
-                    color=discord.Color.red()
-                )
-                await interaction.followup.send(embed=embed, ephemeral=True)
+                await interaction.followup.send(embed=translation_failed_embed(), ephemeral=True)
                 return
             
-            # Create translation embed
-            source_lang_name = bot.language_manager.get_language_name(source_lang)
-            target_lang_name = bot.language_manager.get_language_name(user_lang)
+            embed = build_translation_embed(bot, page_text, translated_text, source_lang, user_lang,
+                                            page, len(pages), complete)
+            view = TranslationPageView(channel_id, message_id, author_id, page, len(pages)) if len(pages) > 1 else discord.utils.MISSING
+            if edit:
+                await interaction.edit_original_response(embed=embed, view=view)
+                reply = None
+            else:
+                reply = await interaction.followup.send(embed=embed, view=view, ephemeral=True, wait=True)
+            
+            # Fill in the rest in place, no more often than STREAM_EDIT_INTERVAL
+            last_edit = time.monotonic()
+            async for translated_text, source_lang, complete in stream:
+                if not complete and time.monotonic() - last_edit < STREAM_EDIT_INTERVAL:
+                    continue
+                if translated_text:
+                    embed = build_translation_embed(bot, page_text, translated_text, source_lang, user_lang,
+                                                    page, len(pages), complete)
+                else:
+                    # A retry in another language came to nothing: don't leave the partial text up
+                    embed = translation_failed_embed()
+                if reply is not None:
+                    await reply.edit(embed=embed)
+                else:
+                    await interaction.edit_original_response(embed=embed)
+                last_edit = time.monotonic()
+        finally:
+            await stream.aclose()
+        
+        # Get the next page ready while the user reads this one
+        if page + 1 < len(pages):
+            bot.run_in_background(bot.translator.translate_text(
+                pages[page + 1], user_lang, author_id=author_id,
+                priority=PRIORITY_SPECULATIVE, user_id=interaction.user.id
+            ))
+        
+    except SchedulerOverloaded as e:
+        embed = discord.Embed(
+            title="⏳ البوت مشغول / Bot Busy",
+            description=f"طلبات ترجمة كثيرة الآن، حاول مرة أخرى بعد {e.retry_after:.0f} ثانية تقريباً\nToo many translations right now, please try again in about {e.retry_after:.0f} seconds",
+            color=discord.Color.orange()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        
+    except Exception as e:
+        embed = discord.Embed(
+            title="❌ خطأ / Error",
+            description=f"حدث خطأ أثناء الترجمة: {str(e)}\nAn error occurred during translation: {str(e)}",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+def translation_failed_embed() -> discord.Embed:
+    """The reply for a message no provider could translate."""
+    return discord.Embed(
+        title="❌ خطأ في الترجمة / Translation Error",
+        description="عذراً، لا يمكن ترجمة هذه الرسالة.\nSorry, this message cannot be translated.",
+        color=discord.Color.red()
+    )
+
+def build_translation_embed(bot, page_text: str, translated_text: str, source_lang: str, user_lang: str,
+                            page: int, page_count: int, complete: bool) -> discord.Embed:
+    """Build the private translation reply for one page, marking it while the rest is still coming."""
+    source_lang_name = bot.language_manager.get_language_name(source_lang)
+    target_lang_name = bot.language_manager.get_language_name(user_lang)
+    
+    embed = discord.Embed(
+        title="🌐 ترجمة / Translation",
+        color=discord.Color.blue()
+    )
+    
+    # Add fields for source and translation
+    embed.add_field(
+        name=f"📝 النص الأصلي ({source_lang_name}) / Original ({source_lang_name})",
+        value=page_text,
+        inline=False
+    )
+    
+    if not complete:
+        translated_text = f"{translated_text[:990]}\n⏳ ..."
+    embed.add_field(
+        name=f"🎯 الترجمة ({target_lang_name}) / Translation ({target_lang_name})",
+        value=translated_text[:1000] + "..." if len(translated_text) > 1000 else translated_text,
+        inline=False
+    )
+    
+    footer = f"مُترجم بواسطة Cloud APIs • لغتك المفضلة: {target_lang_name}"
+    if page_count > 1:
+        footer = f"{footer} • صفحة {page+1}/{page_count} / Page {page+1}/{page_count}"
+    embed.set_footer(text=footer)
+    return embed
+
+async def wait_with_queue_notice(interaction: discord.Interaction, work, estimate_wait):
+    """Await a translation, showing the user a refreshed wait estimate while it sits in the queue."""
+    task = asyncio.ensure_future(work)
+    notice = None
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=WAIT_NOTICE_INTERVAL)
+            if done:
+                return task.result()
+            
+            wait = estimate_wait()
+            if wait is None:
+                continue  # Already translating
             
             embed = discord.Embed(
-                title="🌐 ترجمة / Translation",
-                color=discord.Color.blue()
+                title="⏳ في قائمة الانتظار / Queued",
+                description=f"ستبدأ الترجمة خلال {wait:.0f} ثانية تقريباً\nYour translation starts in about {wait:.0f} seconds",
+                color=discord.Color.orange()
             )
-            
-            # Add fields for source and translation
-            embed.add_field(
-                name=f"📝 النص الأصلي ({source_lang_name}) / Original ({source_lang_name})",
-                value=self.original_message[:1000] + "..." if len(self.original_message) > 1000 else self.original_message,
-                inline=False
+            if notice is None:
+                notice = await interaction.followup.send(embed=embed, ephemeral=True, wait=True)
+            else:
+                await notice.edit(embed=embed)
+    finally:
+        task.cancel()
+        if notice is not None:
+            try:
+                await notice.delete()
+            except discord.HTTPException:
+                pass
+
+class TranslateButton(discord.ui.DynamicItem[discord.ui.Button], template=r'translate:(?P<channel_id>\d+):(?P<message_id>\d+):(?P<author_id>\d+)'):
+    """Stateless translate button; its custom_id carries everything needed to handle a click."""
+    
+    def __init__(self, channel_id: int, message_id: int, author_id: int):
+        super().__init__(
+            discord.ui.Button(
+                label="ترجم",
+                style=discord.ButtonStyle.primary,
+                emoji="🌐",
+                custom_id=f"translate:{channel_id}:{message_id}:{author_id}"
             )
-            
-            embed.add_field(
-                name=f"🎯 الترجمة ({target_lang_name}) / Translation ({target_lang_name})",
-                value=translated_text[:1000] + "..." if len(translated_text) > 1000 else translated_text,
-                inline=False
+        )
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.author_id = author_id
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match['channel_id']), int(match['message_id']), int(match['author_id']))
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Handle translation button click."""
+        await send_translation(interaction, self.channel_id, self.message_id, self.author_id)
+
+class TranslatePageButton(discord.ui.DynamicItem[discord.ui.Button], template=r'trp:(?P<channel_id>\d+):(?P<message_id>\d+):(?P<author_id>\d+):(?P<page>\d+)'):
+    """Turns a paged translation reply to another page, translating that page on demand."""
+    
+    def __init__(self, channel_id: int, message_id: int, author_id: int, page: int, label: str = "التالي / Next", emoji: str = "▶️"):
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=discord.ButtonStyle.secondary,
+                emoji=emoji,
+                custom_id=f"trp:{channel_id}:{message_id}:{author_id}:{page}"
             )
-            
-            embed.set_footer(text=f"مُترجم بواسطة Cloud APIs • لغتك المفضلة: {target_lang_name}")
-            
-            await interaction.followup.send(embed=embed, ephemeral=True)
-            
-        except Exception as e:
-            embed = discord.Embed(
-                title="❌ خطأ / Error",
-                description=f"حدث خطأ أثناء الترجمة: {str(e)}\nAn error occurred during translation: {str(e)}",
-                color=discord.Color.red()
+        )
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.author_id = author_id
+        self.page = page
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match['channel_id']), int(match['message_id']), int(match['author_id']), int(match['page']))
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Show the requested page in place."""
+        await send_translation(interaction, self.channel_id, self.message_id, self.author_id, page=self.page, edit=True)
+
+class SettingsButton(discord.ui.DynamicItem[discord.ui.Button], template=r'translation_settings'):
+    """Stateless settings button shown next to every translate button."""
+    
+    def __init__(self):
+        super().__init__(
+            discord.ui.Button(
+                label="إعدادات",
+                style=discord.ButtonStyle.secondary,
+                emoji="⚙️",
+                custom_id="translation_settings"
             )
-            await interaction.followup.send(embed=embed, ephemeral=True)
+        )
     
-    @discord.ui.button(label="إعدادات", style=discord.ButtonStyle.secondary, emoji="⚙️")
-    async def settings_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls()
+    
+    async def callback(self, interaction: discord.Interaction):
         """Handle settings button click."""
         bot = interaction.client
-        current_lang = bot.language_manager.get_user_language(interaction.user.id)
+        current_lang = await bot.language_manager.get_user_language_async(interaction.user.id)
         current_lang_name = bot.language_manager.get_language_name(current_lang)
         
         # Check button visibility setting
-        buttons_enabled = bot.user_button_settings.get(interaction.user.id, True)
+        buttons_enabled = bot.language_manager.buttons_enabled(interaction.user.id)
         button_status = "مفعلة ✅ / Enabled ✅" if buttons_enabled else "معطلة ❌ / Disabled ❌"
         
         embed = discord.Embed(
@@ -129,6 +296,77 @@ class TranslationView(discord.ui.View):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+class DynamicItemView(discord.ui.View):
+    """A view made only of dynamic items, which the handlers registered in setup_hook serve by custom_id.
+    
+    It is stopped straight away: discord.py keeps an entry for every message sent with a
+    running view, and these need none, so the store no longer grows with traffic.
+    """
+    
+    def __init__(self):
+        super().__init__(timeout=None)
+        self.stop()
+
+class TranslationView(DynamicItemView):
+    """View containing translation buttons for messages.
+    
+    The buttons are dynamic items registered once in setup_hook, so the view holds
+    no message text, runs no timeout task and keeps working across restarts.
+    """
+    
+    def __init__(self, channel_id: int, message_id: int, author_id: int):
+        super().__init__()
+        self.add_item(TranslateButton(channel_id, message_id, author_id))
+        self.add_item(SettingsButton())
+
+class TranslationPageView(DynamicItemView):
+    """Previous/next buttons under a paged translation."""
+    
+    def __init__(self, channel_id: int, message_id: int, author_id: int, page: int, page_count: int):
+        super().__init__()
+        if page > 0:
+            self.add_item(TranslatePageButton(channel_id, message_id, author_id, page - 1, "السابق / Previous", "◀️"))
+        if page + 1 < page_count:
+            self.add_item(TranslatePageButton(channel_id, message_id, author_id, page + 1))
+
+class TranslatePickSelect(discord.ui.DynamicItem[discord.ui.Select], template=r'translate_pick:(?P<channel_id>\d+)'):
+    """Stateless picker covering a burst of messages; each option value is 'message_id:author_id'."""
+    
+    def __init__(self, channel_id: int, messages=()):
+        options = [
+            discord.SelectOption(
+                label=f"{i+1}. {msg.author.display_name}"[:100],
+                description=msg.content[:100],
+                value=f"{msg.id}:{msg.author.id}"
+            )
+            for i, msg in enumerate(messages)
+        ]
+        super().__init__(
+            discord.ui.Select(
+                placeholder="اختر رسالة لترجمتها / Choose a message to translate",
+                options=options or [discord.SelectOption(label="-", value="0:0")],
+                custom_id=f"translate_pick:{channel_id}"
+            )
+        )
+        self.channel_id = channel_id
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(int(match['channel_id']))
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Translate the picked message."""
+        message_id, author_id = (int(part) for part in self.item.values[0].split(':'))
+        await send_translation(interaction, self.channel_id, message_id, author_id)
+
+class BatchTranslationView(DynamicItemView):
+    """One picker standing in for the buttons of several messages sent in a burst."""
+    
+    def __init__(self, channel_id: int, messages):
+        super().__init__()
+        self.add_item(TranslatePickSelect(channel_id, messages))
+        self.add_item(SettingsButton())
+
 class OldMessagesView(discord.ui.View):
     """View for selecting old messages to translate."""
     
@@ -145,11 +383,69 @@ class OldMessagesView(discord.ui.View):
             )
             button.callback = self.create_callback(i, msg)
             self.add_item(button)
+        
+        translate_all = discord.ui.Button(
+            label="ترجمة الكل / Translate all",
+            style=discord.ButtonStyle.success,
+            emoji="📚",
+            custom_id="old_msg_all"
+        )
+        translate_all.callback = self.translate_all
+        self.add_item(translate_all)
+    
+    async def translate_all(self, interaction: discord.Interaction):
+        """Translate every listed message into the user's language in one batch."""
+        bot = interaction.client
+        messages = self.messages[:5]
+        
+        await interaction.response.defer(ephemeral=True)
+        user_lang = await bot.language_manager.get_user_language_async(interaction.user.id)
+        
+        try:
+            results = await bot.translator.translate_many(
+                [msg.content for msg in messages],
+                user_lang,
+                author_ids=[msg.author.id for msg in messages],
+                user_id=interaction.user.id
+            )
+        except SchedulerOverloaded as e:
+            embed = discord.Embed(
+                title="⏳ البوت مشغول / Bot Busy",
+                description=f"طلبات ترجمة كثيرة الآن، حاول مرة أخرى بعد {e.retry_after:.0f} ثانية تقريباً\nToo many translations right now, please try again in about {e.retry_after:.0f} seconds",
+                color=discord.Color.orange()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        except Exception as e:
+            embed = discord.Embed(
+                title="❌ خطأ / Error",
+                description=f"حدث خطأ أثناء الترجمة: {str(e)}\nAn error occurred during translation: {str(e)}",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        target_lang_name = bot.language_manager.get_language_name(user_lang)
+        embed = discord.Embed(
+            title=f"📚 ترجمة الرسائل ({target_lang_name}) / Translated Messages ({target_lang_name})",
+            color=discord.Color.blue()
+        )
+        for i, (msg, (translated_text, source_lang)) in enumerate(zip(messages, results)):
+            if not translated_text:
+                translated_text = "❌ تعذرت الترجمة / Translation failed"
+            embed.add_field(
+                name=f"{i+1}. {msg.author.display_name} ({source_lang})",
+                value=translated_text[:1000] + "..." if len(translated_text) > 1000 else translated_text,
+                inline=False
+            )
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
     
     def create_callback(self, index, message):
         async def callback(interaction):
             # Create translation view for the selected message
-            view = TranslationView(message.content, interaction.user.id)
+            interaction.client.remember_message(message)
+            view = TranslationView(message.channel.id, message.id, message.author.id)
             
             embed = discord.Embed(
                 title="📝 الرسالة المحددة / Selected Message",
@@ -180,16 +476,35 @@ class TranslationBot(commands.Bot):
         )
         
         self.translator = Translator()
+        # Also stores button visibility preferences
         self.language_manager = LanguageManager()
         
-        # User preferences for button visibility
-        self.user_button_settings = {}  # user_id: True/False (True = show buttons)
+        # Recently seen message texts, so clicks rarely need to fetch the message
+        self.message_cache: "OrderedDict[int, str]" = OrderedDict()
+        
+        # Removes buttons from old replies in rate-limited batches
+        self.button_expiry = ButtonExpiryScheduler(self)
+        
+        # Per-channel reply budget; messages over budget share one picker per burst
+        self.reply_throttle = ChannelReplyThrottle()
+        self._pending_batches = {}  # channel_id: [messages waiting for a picker]
+        
+        # Recently active users per channel, whose languages are worth prefetching
+        self._channel_activity: "OrderedDict[int, OrderedDict[int, float]]" = OrderedDict()
+        self._background_tasks = set()
     
     async def setup_hook(self):
         """Setup hook called when bot is starting."""
+        # One handler for every translation button, including ones sent before a restart
+        self.add_dynamic_items(TranslateButton, TranslatePageButton, SettingsButton, TranslatePickSelect)
+        self.button_expiry.start()
+        
         await self.tree.sync()
         print("🔄 تم مزامنة أوامر البوت")
         print("🔄 Bot commands synced")
+        
+        # Open provider connections before the first click needs them, without holding up startup
+        self.run_in_background(self.translator.warm_up())
     
     async def on_ready(self):
         """Called when bot is ready."""
@@ -208,6 +523,97 @@ class TranslationBot(commands.Bot):
             )
         )
     
+    def remember_message(self, message: discord.Message):
+        """Keep a message's text in the bounded message cache."""
+        self.message_cache[message.id] = message.content
+        self.message_cache.move_to_end(message.id)
+        while len(self.message_cache) > MESSAGE_CACHE_SIZE:
+            self.message_cache.popitem(last=False)
+    
+    async def get_message_content(self, channel_id: int, message_id: int) -> Optional[str]:
+        """Get a message's text from the cache, fetching it from Discord on a miss."""
+        content = self.message_cache.get(message_id)
+        if content is not None:
+            self.message_cache.move_to_end(message_id)
+            return content
+        
+        try:
+            channel = self.get_channel(channel_id) or await self.fetch_channel(channel_id)
+            message = await channel.fetch_message(message_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+        
+        self.remember_message(message)
+        return message.content
+    
+    async def on_message_edit(self, before, after):
+        """Keep cached message text in sync with edits."""
+        if after.id in self.message_cache:
+            self.message_cache[after.id] = after.content
+    
+    async def on_interaction(self, interaction: discord.Interaction):
+        """Let user-facing responses go ahead of background button cleanup."""
+        self.button_expiry.notify_interaction()
+        if interaction.channel_id:
+            self._record_activity(interaction.channel_id, interaction.user.id)
+    
+    def _record_activity(self, channel_id: int, user_id: int):
+        """Remember that a user was active in a channel just now."""
+        users = self._channel_activity.get(channel_id)
+        if users is None:
+            users = self._channel_activity[channel_id] = OrderedDict()
+            while len(self._channel_activity) > MESSAGE_CACHE_SIZE:
+                self._channel_activity.popitem(last=False)
+        self._channel_activity.move_to_end(channel_id)
+        users[user_id] = time.monotonic()
+        users.move_to_end(user_id)
+        while len(users) > PREFETCH_ACTIVE_USERS:
+            users.popitem(last=False)
+    
+    async def _audience_languages(self, channel_id: int, exclude_user_id: int) -> list:
+        """Distinct preferred languages of users recently active in a channel, most recent first."""
+        users = self._channel_activity.get(channel_id)
+        if not users:
+            return []
+        cutoff = time.monotonic() - PREFETCH_ACTIVE_WINDOW
+        audience = []
+        for user_id, last_seen in reversed(users.items()):
+            if last_seen < cutoff:
+                break
+            if user_id != exclude_user_id:
+                audience.append(user_id)
+        
+        # One lookup for the whole audience, off the event loop for users not in the hot set
+        preferences = await self.language_manager.get_user_languages(audience)
+        languages = []
+        for user_id in audience:
+            if preferences[user_id] not in languages:
+                languages.append(preferences[user_id])
+        return languages
+    
+    async def _prefetch_for_audience(self, message: discord.Message):
+        """Translate a new message for the channel's active audience."""
+        languages = await self._audience_languages(message.channel.id, message.author.id)
+        if languages:
+            # A click translates the first page, so that is all worth fetching ahead
+            await self.translator.prefetch(translation_pages(message.content)[0], languages, author_id=message.author.id)
+    
+    def _start_prefetch(self, message: discord.Message):
+        """Prefetch a new message's translations in the background."""
+        self.run_in_background(self._prefetch_for_audience(message))
+    
+    def run_in_background(self, coro):
+        """Run work without awaiting it; the task is kept alive until it finishes and failures are logged."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+    
+    def _background_task_done(self, task: asyncio.Task):
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() and not isinstance(task.exception(), SchedulerOverloaded):
+            print(f"⚠️ خطأ في مهمة خلفية: {task.exception()}")
+            print(f"⚠️ Background task error: {task.exception()}")
+    
     async def on_message(self, message):
         """Handle new messages and add translation buttons."""
         print(f"📨 رسالة جديدة من {message.author}: {message.content[:50]}...")
@@ -218,17 +624,19 @@ class TranslationBot(commands.Bot):
             print("🤖 تجاهل رسالة البوت")
             return
         
+        self._record_activity(message.channel.id, message.author.id)
+        
         # Handle button control commands
         content_lower = message.content.lower().strip()
         if content_lower.startswith('/buttons'):
             parts = content_lower.split()
             if len(parts) >= 2:
                 if parts[1] == 'off':
-                    self.user_button_settings[message.author.id] = False
+                    self.language_manager.set_buttons_enabled(message.author.id, False)
                     await message.reply("❌ تم إخفاء أزرار الترجمة\n❌ Translation buttons disabled", mention_author=False)
                     return
                 elif parts[1] == 'on':
-                    self.user_button_settings[message.author.id] = True
+                    self.language_manager.set_buttons_enabled(message.author.id, True)
                     await message.reply("✅ تم تفعيل أزرار الترجمة\n✅ Translation buttons enabled", mention_author=False)
                     return
         
@@ -251,7 +659,7 @@ class TranslationBot(commands.Bot):
             return
         
         # Check if user has buttons enabled
-        if not self.user_button_settings.get(message.author.id, True):
+        if not self.language_manager.buttons_enabled(message.author.id):
             return  # User has disabled buttons, don't add any
         
         try:
@@ -259,7 +667,7 @@ class TranslationBot(commands.Bot):
             print("✅ Attempting to add translation button...")
             
             # Add translation button to the message
-            view = TranslationView(message.content, message.author.id)
+            view = TranslationView(message.channel.id, message.id, message.author.id)
             
             # Don't send button if message is too long
             if len(message.content) > 1500:
@@ -286,14 +694,22 @@ class TranslationBot(commands.Bot):
                     await message.reply("❌ يرجى كتابة كود اللغة\nPlease provide language code\nمثال/Example: /set_language ar", mention_author=False)
                 return
             
+            self.remember_message(message)
+            if PREFETCH_ENABLED:
+                self._start_prefetch(message)
+            
+            # Over the channel's reply budget: cover this message with the next burst picker
+            if not self.reply_throttle.allow(message.channel.id):
+                self._queue_for_batch(message)
+                return
+            
             # Send the button as a reply (but don't mention)
             reply_message = await message.reply(
                 "🌐 اضغط للترجمة • Click to translate",
                 view=view,
                 mention_author=False
             )
-            # Store reference for timeout handling
-            view.message = reply_message
+            self.button_expiry.schedule(reply_message.channel.id, reply_message.id)
             print("🎯 تم إضافة زر الترجمة بنجاح!")
             print("🎯 Translation button added successfully!")
             
@@ -304,6 +720,45 @@ class TranslationBot(commands.Bot):
             print(f"❌ خطأ في معالجة الرسالة: {e}")
             print(f"❌ Error processing message: {e}")
     
+    def _queue_for_batch(self, message: discord.Message):
+        """Add a message to its channel's burst; the first one schedules the picker."""
+        batch = self._pending_batches.get(message.channel.id)
+        if batch is None:
+            batch = self._pending_batches[message.channel.id] = []
+            self.loop.call_later(
+                BUTTON_COALESCE_WINDOW,
+                lambda: self.run_in_background(self._send_batch(message.channel))
+            )
+        batch.append(message)
+        # Only the most recent messages fit in one picker
+        del batch[:-BUTTON_COALESCE_MAX]
+    
+    async def _send_batch(self, channel):
+        """Post one picker covering every message queued in the burst."""
+        messages = self._pending_batches.pop(channel.id, [])
+        if not messages:
+            return
+        
+        try:
+            if len(messages) == 1:
+                message = messages[0]
+                reply_message = await message.reply(
+                    "🌐 اضغط للترجمة • Click to translate",
+                    view=TranslationView(channel.id, message.id, message.author.id),
+                    mention_author=False
+                )
+            else:
+                reply_message = await channel.send(
+                    f"🌐 {len(messages)} رسائل جديدة - اختر للترجمة • {len(messages)} new messages - pick one to translate",
+                    view=BatchTranslationView(channel.id, messages)
+                )
+            self.button_expiry.schedule(channel.id, reply_message.id)
+            print(f"🧺 تم تجميع {len(messages)} رسالة في رد واحد")
+            print(f"🧺 Coalesced {len(messages)} messages into one reply")
+        except discord.HTTPException:
+            # Handle rate limits or permission errors silently
+            pass
+    
     async def handle_old_messages_translation(self, message):
         """Handle translation of old messages in the channel."""
         try:
@@ -324,18 +779,22 @@ class TranslationBot(commands.Bot):
             
             embed = discord.Embed(
                 title="📜 الرسائل القديمة / Old Messages",
-                description="اختر رسالة لترجمتها:\nChoose a message to translate:",
+                description="اختر رسالة لترجمتها أو ترجم الكل:\nChoose a message to translate, or translate them all:",
                 color=discord.Color.blue()
             )
             
             # Create view with buttons for each message
             view = OldMessagesView(messages)
             
+            # Detect the shown messages' languages in one batch off the event loop
+            detected_langs = await self.translator.detect_many([msg.content for msg in messages[:5]])
+            
             # Add message previews to embed
             for i, msg in enumerate(messages[:5]):  # Show first 5
                 preview = msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
+                lang_code = detected_langs[i] or "?"
                 embed.add_field(
-                    name=f"{i+1}. {msg.author.display_name}",
+                    name=f"{i+1}. {msg.author.display_name} ({lang_code})",
                     value=f"`{preview}`",
                     inline=False
                 )
@@ -436,7 +895,7 @@ class TranslationBot(commands.Bot):
     @app_commands.command(name="my_language", description="عرض لغتك المفضلة الحالية / Show your current preferred language")
     async def my_language(self, interaction: discord.Interaction):
         """Show user's current preferred language."""
-        user_lang = self.language_manager.get_user_language(interaction.user.id)
+        user_lang = await self.language_manager.get_user_language_async(interaction.user.id)
         lang_name = self.language_manager.get_language_name(user_lang)
         
         embed = discord.Embed(
@@ -522,5 +981,8 @@ class TranslationBot(commands.Bot):
     
     async def close(self):
         """Close the bot and cleanup resources."""
+        await self.button_expiry.stop()
         await self.translator.close()
+        # Flush pending preference changes off the event loop
+        await asyncio.to_thread(self.language_manager.close)
         await super().close()
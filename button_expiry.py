@@ -0,0 +1,154 @@
+"""Central scheduler that removes expired translation buttons under a rate budget."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from config import (
+    BUTTON_LIFETIME, BUTTON_EXPIRY_MODE, EXPIRY_EDITS_PER_SECOND,
+    EXPIRY_CHANNEL_INTERVAL, EXPIRY_QUIET_PERIOD, EXPIRY_MAX_LAG,
+)
+
+
+class ButtonExpiryScheduler:
+    """Min-heap of button replies to clean up, drained by one background task.
+
+    Due replies are grouped per channel and cleaned up round-robin, spaced by
+    EXPIRY_CHANNEL_INTERVAL within a channel and EXPIRY_EDITS_PER_SECOND overall.
+    Cleanup pauses for EXPIRY_QUIET_PERIOD after every user interaction so
+    expiry traffic never competes with user-facing responses.
+    """
+
+    def __init__(self, bot: discord.Client, mode: str = BUTTON_EXPIRY_MODE):
+        self.bot = bot
+        self.mode = mode  # 'edit' removes the buttons, 'delete' removes the reply, 'skip' leaves it
+        self._heap: List[Tuple[float, int, int, int]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._quiet_until = 0.0
+        self._next_slot = 0.0
+        self._channel_next_slot: Dict[int, float] = {}
+        self.completed = 0
+        self.skipped = 0
+
+    def start(self):
+        """Start the background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task; pending expirations are dropped (the buttons keep working)."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, channel_id: int, message_id: int, delay: float = BUTTON_LIFETIME):
+        """Clean up a button reply after ``delay`` seconds."""
+        if self.mode == 'skip':
+            return
+        was_next = not self._heap or time.monotonic() + delay < self._heap[0][0]
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), channel_id, message_id))
+        if was_next:
+            self._wakeup.set()
+
+    def notify_interaction(self):
+        """Hold expiry work back briefly because a user is waiting on the bot."""
+        self._quiet_until = time.monotonic() + EXPIRY_QUIET_PERIOD
+
+    def pending(self) -> int:
+        """Get the number of replies waiting to be cleaned up."""
+        return len(self._heap)
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._drain_due()
+
+    def _pop_due(self) -> Dict[int, List[Tuple[float, int]]]:
+        """Pop every due reply, grouped by channel."""
+        now = time.monotonic()
+        by_channel: Dict[int, List[Tuple[float, int]]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, channel_id, message_id = heapq.heappop(self._heap)
+            by_channel.setdefault(channel_id, []).append((deadline, message_id))
+        return by_channel
+
+    async def _drain_due(self):
+        """Clean up due replies, interleaving channels so none hogs the budget."""
+        by_channel = self._pop_due()
+        while by_channel:
+            for channel_id in list(by_channel):
+                deadline, message_id = by_channel[channel_id].pop(0)
+                if not by_channel[channel_id]:
+                    del by_channel[channel_id]
+
+                if time.monotonic() - deadline > EXPIRY_MAX_LAG:
+                    # Too far behind: leave the (still working) buttons rather than add to a backlog
+                    self.skipped += 1
+                    continue
+
+                await self._wait_for_slot(channel_id)
+                try:
+                    await self._expire(channel_id, message_id)
+                except Exception as e:
+                    # One failed cleanup (a dropped connection, say) must not end the task for good
+                    print(f"⚠️ خطأ غير متوقع في إزالة الأزرار: {e}")
+                    print(f"⚠️ Unexpected error removing buttons: {e}")
+
+    async def _wait_for_slot(self, channel_id: int):
+        """Sleep until the global and per-channel budgets allow another request."""
+        while True:
+            now = time.monotonic()
+            ready_at = max(self._quiet_until, self._next_slot, self._channel_next_slot.get(channel_id, 0.0))
+            if ready_at <= now:
+                break
+            await asyncio.sleep(ready_at - now)
+
+        now = time.monotonic()
+        self._next_slot = now + 1.0 / EXPIRY_EDITS_PER_SECOND
+        self._channel_next_slot[channel_id] = now + EXPIRY_CHANNEL_INTERVAL
+        if len(self._channel_next_slot) > 1000:
+            self._channel_next_slot = {
+                cid: slot for cid, slot in self._channel_next_slot.items() if slot > now
+            }
+
+    async def _expire(self, channel_id: int, message_id: int):
+        """Remove one reply's buttons, or the reply itself."""
+        message = self.bot.get_partial_messageable(channel_id).get_partial_message(message_id)
+        try:
+            if self.mode == 'delete':
+                await message.delete()
+            else:
+                await message.edit(view=None)
+            self.completed += 1
+        except (discord.NotFound, discord.Forbidden):
+            pass  # Ignore errors if message was deleted or we can't edit
+        except discord.HTTPException as e:
+            if e.status == 429:
+                # Back off the whole channel instead of retrying straight away
+                retry_after = getattr(e, 'retry_after', None) or 5.0
+                self._channel_next_slot[channel_id] = time.monotonic() + retry_after
+            print(f"⚠️ خطأ في إزالة الأزرار: {e}")
+            print(f"⚠️ Error removing buttons: {e}")
@@ -88,7 +88,120 @@ DEFAULT_LANGUAGE = 'en'
 BOT_PREFIX = '!'
 MAX_MESSAGE_LENGTH = 2000
 TRANSLATION_TIMEOUT = 30  # seconds
+BUTTON_LIFETIME = 300  # seconds before translation buttons are removed from a reply
+BUTTON_EXPIRY_MODE = 'edit'  # 'edit' removes the buttons, 'delete' removes the reply, 'skip' leaves it
+EXPIRY_EDITS_PER_SECOND = 2  # expiry requests across all channels
+EXPIRY_CHANNEL_INTERVAL = 2.0  # seconds between expiry requests in one channel
+EXPIRY_QUIET_PERIOD = 1.0  # seconds expiry work pauses after a user interaction
+EXPIRY_MAX_LAG = 600  # seconds overdue after which an expiry is skipped
+BUTTON_REPLY_BURST = 3  # button replies a channel can get back to back
+BUTTON_REPLY_RATE = 0.2  # button replies per second a channel earns back
+BUTTON_COALESCE_WINDOW = 5.0  # seconds over-budget messages are collected into one picker
+BUTTON_COALESCE_MAX = 10  # most recent messages listed in one picker (Discord allows 25)
+MESSAGE_CACHE_SIZE = 5000  # recent message texts kept for button clicks
+TRANSLATION_PAGE_CHARS = 900  # original text per page of a translation reply (embed fields hold 1024)
+STREAM_EDIT_INTERVAL = 1.0  # seconds between edits while a long translation fills in
 
 # Translation model settings
-MODEL_CACHE_DIR = "./models"
+MODEL_CACHE_DIR = "./models"  # local cache directory, home of the translation store
 MAX_TRANSLATION_LENGTH = 1000  # characters
+
+# Translation cache settings
+TRANSLATION_CACHE_SIZE = 5000  # entries kept in memory
+TRANSLATION_CACHE_TTL = 3600  # seconds
+
+# Persistent translation store (second-tier cache shared by all processes)
+TRANSLATION_STORE_PATH = f"{MODEL_CACHE_DIR}/translations.db"
+TRANSLATION_STORE_MAX_BYTES = 50 * 1024 * 1024  # compressed payload budget
+
+# Translation memory for sentences already translated
+TM_SIZE = 20000  # translated sentences remembered across all language pairs
+
+# Long text translation concurrency
+CHUNK_CONCURRENCY = 4  # chunks of one message translated at the same time
+GLOBAL_CHUNK_CONCURRENCY = 16  # chunks translated at the same time across all messages
+
+# Request size limits in UTF-8 bytes; texts are chunked to fit every configured provider
+PROVIDER_MAX_BYTES = {
+    'mymemory': 500,
+    'libre': 2000,
+}
+
+# Packing several short texts into one provider request
+BATCH_DELIMITER = "|||"  # line between packed texts; kept verbatim by the providers
+
+# Hedged provider requests: start the backup provider if the primary hasn't
+# answered within roughly its p95 latency, and keep whichever valid result comes first
+HEDGE_ENABLED = True
+HEDGE_DEFAULT_DELAY = 2.0  # seconds, used until enough latency samples exist
+HEDGE_MIN_DELAY = 0.5  # seconds
+HEDGE_MAX_DELAY = 5.0  # seconds
+HEDGE_MIN_SAMPLES = 20
+
+# Translation providers, in default preference order
+TRANSLATION_PROVIDERS = ['mymemory', 'libre']
+
+# Provider routing and circuit breakers
+ROUTER_EWMA_ALPHA = 0.2  # weight of the newest sample in success/latency averages
+ROUTER_FAILURE_THRESHOLD = 5  # consecutive failures that open a circuit
+ROUTER_OPEN_SECONDS = 30  # how long an open circuit blocks a provider before probing
+ROUTER_MAX_OPEN_SECONDS = 600  # cap for the backoff after failed probes
+ROUTER_DEFAULT_LATENCY = 1.0  # seconds, assumed for providers without samples
+ROUTER_RECOVERY_SECONDS = 300  # time constant for forgetting old failures
+
+# English pivot for pairs the providers can't translate directly
+PIVOT_ROUTE_FAILURES = 3  # direct attempts in a row the pivot has to rescue before a pair goes straight to it
+PIVOT_ROUTE_TTL = 3600  # seconds a pair keeps going straight to the pivot before direct is retried
+
+# HTTP connection pool for translation providers
+HTTP_POOL_LIMIT = 100  # open connections in total
+HTTP_POOL_LIMIT_PER_HOST = 20  # open connections per provider host
+HTTP_DNS_CACHE_TTL = 300  # seconds
+HTTP_KEEPALIVE_TIMEOUT = 60  # seconds an idle connection is kept open
+HTTP_CONNECT_TIMEOUT = 5  # seconds
+HTTP_READ_TIMEOUT = 10  # seconds between received bytes
+PROVIDER_TIMEOUTS = {  # total seconds per request
+    'mymemory': 15,
+    'libre': 10,
+}
+
+# Language detection
+DETECTION_WORKERS = 2  # threads running langdetect off the event loop
+SCRIPT_CONFIDENCE = 0.6  # share of letters the dominant script needs for the fast path
+LANGDETECT_CONFIDENCE = 0.5  # below this, prefer the script's default language
+MARKER_MIN_SHARE = 0.05  # share of letters marker letters need when letters of the script's default language are present too
+AUTHOR_PROFILE_SIZE = 50000  # authors whose usual language is remembered
+AUTHOR_PROFILE_MIN_SAMPLES = 3  # agreeing detections before an author's language is trusted
+AUTHOR_PROFILE_RECENT_TEXTS = 8  # recent texts per author remembered so each message counts once
+AUTHOR_PROFILE_CHECK_INTERVAL = 10  # uses of a trusted profile before langdetect checks it again
+AUTHOR_PROFILE_CHECK_LENGTH = 60  # characters from which langdetect is reliable enough to run even for trusted profiles
+
+# User preference persistence
+PREFERENCES_BACKEND = 'sqlite'  # 'sqlite' or 'json'
+PREFERENCES_DB_PATH = "user_preferences.db"
+PREFERENCES_JSON_PATH = "user_languages.json"  # legacy store, imported into SQLite once
+BUTTON_SETTINGS_JSON_PATH = "button_settings.json"  # button opt-outs for the JSON backend
+PREFERENCES_SAVE_DELAY = 2.0  # seconds to coalesce preference changes before writing
+PREFERENCES_CACHE_SIZE = 10000  # users kept in the in-memory hot set
+PREFERENCES_CACHE_TTL = 60  # seconds before a cached preference is re-read (other shards may write)
+
+# Speculative pre-translation for a channel's active audience
+PREFETCH_ENABLED = True
+PREFETCH_MAX_LANGUAGES = 3  # target languages prefetched per message
+PREFETCH_BUDGET_PER_MINUTE = 30  # prefetched translations per minute, across all channels
+PREFETCH_CONCURRENCY = 2  # prefetches running at the same time
+PREFETCH_ACTIVE_WINDOW = 600  # seconds a user counts as active in a channel
+PREFETCH_ACTIVE_USERS = 20  # most recently active users tracked per channel
+
+# Translation job scheduling
+SCHEDULER_WORKERS = 8  # translation jobs running at once
+SCHEDULER_RESERVED_WORKERS = 2  # workers only interactive jobs may use
+SCHEDULER_QUEUE_LIMITS = {  # queued jobs (all priorities) beyond which new jobs of this priority are shed
+    'interactive': 200,
+    'bulk': 100,
+    'speculative': 20,
+}
+SCHEDULER_MAX_QUEUED_PER_USER = 25  # queued jobs one user may have waiting
+SCHEDULER_DEFAULT_SERVICE_TIME = 1.5  # seconds per job before any have been measured
+SCHEDULER_EWMA_ALPHA = 0.2  # weight of the newest job duration in the average
+WAIT_NOTICE_INTERVAL = 2.0  # seconds between queue position updates shown to a waiting user
@@ -0,0 +1,318 @@
+"""Tiered language detection: Unicode script fast path ahead of langdetect."""
+
+import re
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Set, Tuple
+
+from langdetect import detect_langs, DetectorFactory, LangDetectException
+
+from config import (
+    SCRIPT_CONFIDENCE, LANGDETECT_CONFIDENCE, MARKER_MIN_SHARE, AUTHOR_PROFILE_SIZE, AUTHOR_PROFILE_MIN_SAMPLES,
+    AUTHOR_PROFILE_RECENT_TEXTS, AUTHOR_PROFILE_CHECK_INTERVAL, AUTHOR_PROFILE_CHECK_LENGTH,
+)
+
+# Set seed for consistent language detection
+DetectorFactory.seed = 0
+
+# (first code point, last code point, script)
+_SCRIPT_RANGES = sorted([
+    (0x0041, 0x005A, 'Latin'), (0x0061, 0x007A, 'Latin'),
+    (0x00C0, 0x024F, 'Latin'), (0x1E00, 0x1EFF, 'Latin'),
+    (0x0370, 0x03FF, 'Greek'), (0x1F00, 0x1FFF, 'Greek'),
+    (0x0400, 0x052F, 'Cyrillic'),
+    (0x0530, 0x058F, 'Armenian'),
+    (0x0590, 0x05FF, 'Hebrew'),
+    (0x0600, 0x06FF, 'Arabic'), (0x0750, 0x077F, 'Arabic'), (0x08A0, 0x08FF, 'Arabic'),
+    (0xFB50, 0xFDFF, 'Arabic'), (0xFE70, 0xFEFF, 'Arabic'),
+    (0x0900, 0x097F, 'Devanagari'),
+    (0x0980, 0x09FF, 'Bengali'),
+    (0x0A00, 0x0A7F, 'Gurmukhi'),
+    (0x0A80, 0x0AFF, 'Gujarati'),
+    (0x0B80, 0x0BFF, 'Tamil'),
+    (0x0C00, 0x0C7F, 'Telugu'),
+    (0x0C80, 0x0CFF, 'Kannada'),
+    (0x0D00, 0x0D7F, 'Malayalam'),
+    (0x0D80, 0x0DFF, 'Sinhala'),
+    (0x0E00, 0x0E7F, 'Thai'),
+    (0x0E80, 0x0EFF, 'Lao'),
+    (0x1000, 0x109F, 'Myanmar'),
+    (0x10A0, 0x10FF, 'Georgian'),
+    (0x1100, 0x11FF, 'Hangul'), (0x3130, 0x318F, 'Hangul'), (0xAC00, 0xD7AF, 'Hangul'),
+    (0x1200, 0x137F, 'Ethiopic'),
+    (0x1780, 0x17FF, 'Khmer'),
+    (0x3040, 0x30FF, 'Kana'), (0x31F0, 0x31FF, 'Kana'), (0xFF66, 0xFF9F, 'Kana'),
+    (0x3400, 0x4DBF, 'Han'), (0x4E00, 0x9FFF, 'Han'), (0xF900, 0xFAFF, 'Han'),
+])
+_RANGE_STARTS = [start for start, _, _ in _SCRIPT_RANGES]
+
+# Scripts used by exactly one supported language
+SCRIPT_LANGUAGES = {
+    'Greek': 'el',
+    'Armenian': 'hy',
+    'Hebrew': 'he',
+    'Bengali': 'bn',
+    'Gurmukhi': 'pa',
+    'Gujarati': 'gu',
+    'Tamil': 'ta',
+    'Telugu': 'te',
+    'Kannada': 'kn',
+    'Malayalam': 'ml',
+    'Sinhala': 'si',
+    'Thai': 'th',
+    'Lao': 'lo',
+    'Myanmar': 'my',
+    'Georgian': 'ka',
+    'Hangul': 'ko',
+    'Ethiopic': 'am',
+    'Khmer': 'km',
+    'Kana': 'ja',
+    'Han': 'zh',
+}
+
+# Letters that single out one language within a shared script, checked in order
+_MARKER_LETTERS = {
+    'Arabic': [
+        ('ur', set('ٹڈڑںےہ')),
+        ('fa', set('پژکی')),
+    ],
+    'Cyrillic': [
+        ('be', set('ўЎ')),
+        ('kk', set('әғқұһӘҒҚҰҺ')),
+        ('mk', set('ѓќѕљњџЃЌЅЉЊЏ')),
+        ('uk', set('їєґЇЄҐ')),
+        ('ru', set('ыэёЫЭЁ')),
+    ],
+}
+
+# Marker-like letters other languages' dialects use too (Gulf and Iraqi Arabic write چ and گ):
+# they send the text to langdetect but never decide on their own
+_SHARED_MARKERS = {
+    'Arabic': set('چگ'),
+}
+
+# Letters only the script's default language uses; with these present, markers
+# need MARKER_MIN_SHARE of the letters to outweigh them
+_DEFAULT_ONLY_LETTERS = {
+    'Arabic': set('ةىأإ'),
+}
+
+# Shared scripts where one language is common enough to answer without langdetect
+_MARKER_DEFAULTS = {
+    'Arabic': 'ar',
+}
+
+# Languages langdetect may answer with for a script; anything else is a misfire
+_SCRIPT_CANDIDATES = {
+    'Arabic': {'ar', 'fa', 'ur'},
+}
+
+# Best guess for shared scripts when neither markers nor langdetect are conclusive
+_SCRIPT_DEFAULTS = {
+    'Arabic': 'ar',
+    'Cyrillic': 'ru',
+    'Devanagari': 'hi',
+}
+
+
+def script_of(char: str) -> Optional[str]:
+    """Get the script of a single character, or None for unlisted ones."""
+    code = ord(char)
+    index = bisect_right(_RANGE_STARTS, code) - 1
+    if index >= 0:
+        start, end, script = _SCRIPT_RANGES[index]
+        if code <= end:
+            return script
+    return None
+
+
+def script_histogram(text: str) -> Dict[str, int]:
+    """Count letters per script, ignoring digits, punctuation and symbols."""
+    counts: Dict[str, int] = {}
+    for char in text:
+        if not char.isalpha():
+            continue
+        if char < '\x80':
+            script = 'Latin'
+        else:
+            script = script_of(char)
+            if script is None:
+                continue
+        counts[script] = counts.get(script, 0) + 1
+    return counts
+
+
+def dominant_script(text: str) -> Optional[str]:
+    """Get the script of most letters in the text, or None when it isn't clear-cut."""
+    if text.isascii():
+        return 'Latin' if any(char.isalpha() for char in text) else None
+
+    counts = script_histogram(text)
+    if not counts:
+        return None
+
+    # Japanese mixes kanji and kana; Korean can mix hanja into hangul
+    if 'Han' in counts and ('Kana' in counts or 'Hangul' in counts):
+        partner = 'Kana' if counts.get('Kana', 0) >= counts.get('Hangul', 0) else 'Hangul'
+        counts[partner] += counts.pop('Han')
+
+    script, count = max(counts.items(), key=lambda item: item[1])
+    if count / sum(counts.values()) < SCRIPT_CONFIDENCE:
+        return None
+    return script
+
+
+def detect_by_script(text: str, script: Optional[str]) -> Optional[str]:
+    """Infer the language from the text's dominant script, or None if the script is shared."""
+    if script is None:
+        return None
+
+    language = SCRIPT_LANGUAGES.get(script)
+    if language:
+        return language
+
+    default_only = _DEFAULT_ONLY_LETTERS.get(script, ())
+    for language, letters in _MARKER_LETTERS.get(script, ()):
+        found = sum(char in letters for char in text)
+        if not found:
+            continue
+        if any(char in default_only for char in text):
+            # Mixed signals: a stray marker in otherwise default-language text isn't enough
+            letter_count = sum(char.isalpha() for char in text)
+            if found / letter_count < MARKER_MIN_SHARE:
+                return None
+        return language
+
+    if any(char in _SHARED_MARKERS.get(script, ()) for char in text):
+        return None
+    return _MARKER_DEFAULTS.get(script)
+
+
+def detect_with_langdetect(text: str, candidates: Optional[Set[str]] = None) -> Optional[tuple]:
+    """Run langdetect and return (language, probability), or None.
+
+    With ``candidates``, the most likely of those languages is returned instead.
+    """
+    # Clean text for better detection
+    cleaned_text = re.sub(r'[^\w\s]', ' ', text)
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
+
+    if len(cleaned_text) < 3:
+        return None
+
+    try:
+        results = detect_langs(cleaned_text)
+    except LangDetectException:
+        return None
+    for result in results:
+        if candidates is None or result.lang in candidates:
+            return result.lang, result.prob
+    return None
+
+
+class LanguageDetector:
+    """Detects languages by script first and falls back to langdetect for shared scripts."""
+
+    def __init__(self):
+        self.fast_path_hits = 0
+        self.langdetect_calls = 0
+
+    def detect_fast(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """Script-only detection. Returns (language or None, dominant script)."""
+        script = dominant_script(text)
+        language = detect_by_script(text, script)
+        if language:
+            self.fast_path_hits += 1
+        return language, script
+
+    def detect_slow(self, text: str, script: Optional[str] = None) -> Optional[str]:
+        """langdetect for text whose script is shared by several languages."""
+        self.langdetect_calls += 1
+        result = detect_with_langdetect(text, _SCRIPT_CANDIDATES.get(script))
+        fallback = _SCRIPT_DEFAULTS.get(script)
+        if result is None:
+            return fallback
+
+        language, probability = result
+        if probability < LANGDETECT_CONFIDENCE and fallback:
+            return fallback
+        return language
+
+    def detect(self, text: str) -> Optional[str]:
+        """Detect the language of the input text."""
+        language, script = self.detect_fast(text)
+        return language or self.detect_slow(text, script)
+
+
+class _Profile:
+    __slots__ = ('language', 'script', 'confidence', 'uses', 'recent')
+
+    def __init__(self, language: str, script: str):
+        self.language = language
+        self.script = script
+        self.confidence = 1
+        self.uses = 0  # times the profile stood in for detection since langdetect last checked it
+        self.recent: deque = deque(maxlen=AUTHOR_PROFILE_RECENT_TEXTS)  # hashes of texts already counted
+
+
+class AuthorLanguageProfiles:
+    """Bounded per-author memory of the language each author usually writes in.
+
+    Each message counts once, however many languages it is translated into. An
+    established profile still hands over to langdetect for long texts and every
+    AUTHOR_PROFILE_CHECK_INTERVAL uses, so an author who switches language is noticed.
+    """
+
+    def __init__(self, max_authors: int = AUTHOR_PROFILE_SIZE, min_samples: int = AUTHOR_PROFILE_MIN_SAMPLES):
+        self.max_authors = max_authors
+        self.min_samples = min_samples
+        self._profiles: "OrderedDict[int, _Profile]" = OrderedDict()
+
+    def lookup(self, author_id: Optional[int], script: Optional[str], text: str = '') -> Optional[str]:
+        """Get the author's usual language if it is established, the text's script agrees
+        and no langdetect check is due for this text."""
+        if author_id is None or script is None:
+            return None
+
+        profile = self._profiles.get(author_id)
+        if profile is None or profile.confidence < self.min_samples or profile.script != script:
+            return None
+
+        self._profiles.move_to_end(author_id)
+        # Long texts are where langdetect is reliable; short ones get checked now and then
+        if len(text) >= AUTHOR_PROFILE_CHECK_LENGTH or profile.uses >= AUTHOR_PROFILE_CHECK_INTERVAL:
+            profile.uses = 0
+            return None
+        profile.uses += 1
+        return profile.language
+
+    def update(self, author_id: Optional[int], language: Optional[str], script: Optional[str], text: str = ''):
+        """Fold a fresh detection of ``text`` into the author's profile, once per distinct text."""
+        if author_id is None or not language or script is None:
+            return
+
+        profile = self._profiles.get(author_id)
+        if profile is None:
+            profile = self._profiles[author_id] = _Profile(language, script)
+            profile.recent.append(hash(text))
+            while len(self._profiles) > self.max_authors:
+                self._profiles.popitem(last=False)
+            return
+
+        self._profiles.move_to_end(author_id)
+        # The same message translated into several languages is still one sample
+        text_hash = hash(text)
+        if text_hash in profile.recent:
+            return
+        profile.recent.append(text_hash)
+
+        if profile.language == language:
+            profile.confidence = min(profile.confidence + 1, self.min_samples * 2)
+        elif profile.confidence > 1:
+            # One outlier weakens the profile, several in a row replace it
+            profile.confidence -= 1
+        else:
+            profile.language, profile.script, profile.confidence, profile.uses = language, script, 1, 0
+
+    def __len__(self) -> int:
+        return len(self._profiles)
@@ -1,56 +1,197 @@
 """Language preference management for Discord users."""
 
-from typing import Dict, Optional
-import json
-import os
-from config import SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+import threading
+import time
+from config import (
+    SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE, PREFERENCES_SAVE_DELAY,
+    PREFERENCES_CACHE_SIZE, PREFERENCES_CACHE_TTL,
+)
+from preference_store import PreferenceBackend, create_backend
 
 class LanguageManager:
     """Manages user language preferences."""
     
-    def __init__(self):
-        self.user_languages: Dict[int, str] = {}
-        self.data_file = "user_languages.json"
-        self.load_preferences()
-    
-    def load_preferences(self):
-        """Load user language preferences from file."""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Convert string keys back to integers
-                    self.user_languages = {int(k): v for k, v in data.items()}
-                print(f"✅ تم تحميل تفضيلات {len(self.user_languages)} مستخدم")
-                print(f"✅ Loaded preferences for {len(self.user_languages)} users")
-        except Exception as e:
-            print(f"⚠️ خطأ في تحميل التفضيلات: {e}")
-            print(f"⚠️ Error loading preferences: {e}")
-            self.user_languages = {}
+    def __init__(self, backend: Optional[PreferenceBackend] = None):
+        # Rows are faulted in from the backend on demand, never loaded wholesale
+        self.backend = backend or create_backend()
+        # Hot set of recent lookups: user_id -> (expires_at, language or None)
+        self._cache: "OrderedDict[int, Tuple[float, Optional[str]]]" = OrderedDict()
+        # Users who turned translation buttons off; checked on every message, so keep it a set.
+        # Reloaded every PREFERENCES_CACHE_TTL so opt-outs made by other processes show up here
+        self._buttons_disabled: Set[int] = self.backend.load_buttons_disabled()
+        self._buttons_loaded_at = time.monotonic()
+        print(f"✅ تم تحميل تفضيلات {self.backend.count()} مستخدم")
+        print(f"✅ Loaded preferences for {self.backend.count()} users")
+        
+        # Write-behind persistence: changes are coalesced and saved by a worker thread
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._pending: Dict[int, str] = {}
+        self._pending_buttons: Dict[int, bool] = {}  # user_id -> buttons disabled
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="preferences-writer", daemon=True)
+        self._writer.start()
     
     def save_preferences(self):
-        """Save user language preferences to file."""
+        """Write pending preference changes to the backend."""
+        with self._save_lock:
+            with self._lock:
+                changes, self._pending = self._pending, {}
+                button_changes, self._pending_buttons = self._pending_buttons, {}
+            
+            try:
+                if changes:
+                    self.backend.set_languages(changes)
+                    changes = {}
+                if button_changes:
+                    self.backend.set_buttons_disabled(button_changes)
+            except Exception as e:
+                with self._lock:
+                    # Keep newer changes made while we were writing; retry on the next flush
+                    self._pending = {**changes, **self._pending}
+                    self._pending_buttons = {**button_changes, **self._pending_buttons}
+                print(f"⚠️ خطأ في حفظ التفضيلات: {e}")
+                print(f"⚠️ Error saving preferences: {e}")
+    
+    def _write_loop(self):
+        """Worker thread: save pending changes at most once per PREFERENCES_SAVE_DELAY
+        and reload button opt-outs every PREFERENCES_CACHE_TTL."""
+        while not self._stop.is_set():
+            if self._wake.wait(PREFERENCES_CACHE_TTL):
+                self._wake.clear()
+                # Let more changes pile up before writing; close() cuts the wait short
+                self._stop.wait(PREFERENCES_SAVE_DELAY)
+                self.save_preferences()
+            if time.monotonic() - self._buttons_loaded_at >= PREFERENCES_CACHE_TTL and not self._stop.is_set():
+                self.refresh_buttons_disabled()
+    
+    def refresh_buttons_disabled(self):
+        """Reload button opt-outs from the backend, keeping local changes not yet saved."""
         try:
-            # Convert integer keys to strings for JSON serialization
-            data = {str(k): v for k, v in self.user_languages.items()}
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            disabled = self.backend.load_buttons_disabled()
         except Exception as e:
-            print(f"⚠️ خطأ في حفظ التفضيلات: {e}")
-            print(f"⚠️ Error saving preferences: {e}")
+            print(f"⚠️ خطأ في قراءة التفضيلات: {e}")
+            print(f"⚠️ Error reading preferences: {e}")
+            return
+        with self._lock:
+            for user_id, is_disabled in self._pending_buttons.items():
+                if is_disabled:
+                    disabled.add(user_id)
+                else:
+                    disabled.discard(user_id)
+            self._buttons_disabled = disabled
+            self._buttons_loaded_at = time.monotonic()
+    
+    def flush(self):
+        """Save pending changes now."""
+        self.save_preferences()
+    
+    def close(self):
+        """Stop the writer thread, save any pending changes and close the backend."""
+        self._stop.set()
+        self._wake.set()
+        self._writer.join(timeout=PREFERENCES_SAVE_DELAY + 5)
+        self.flush()
+        self.backend.close()
+    
+    def _remember(self, user_id: int, language: Optional[str]):
+        """Put a lookup result into the bounded hot set."""
+        self._cache[user_id] = (time.monotonic() + PREFERENCES_CACHE_TTL, language)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > PREFERENCES_CACHE_SIZE:
+            self._cache.popitem(last=False)
     
     def set_user_language(self, user_id: int, language_code: str) -> bool:
-        """Set user's preferred language."""
+        """Set user's preferred language; the backend is written in the background."""
         if language_code.lower() not in SUPPORTED_LANGUAGES:
             return False
         
-        self.user_languages[user_id] = language_code.lower()
-        self.save_preferences()
+        with self._lock:
+            self._pending[user_id] = language_code.lower()
+        self._remember(user_id, language_code.lower())
+        self._wake.set()
         return True
     
+    def _lookup_cached(self, user_id: int) -> Tuple[bool, Optional[str]]:
+        """(found, language) from the hot set or unsaved changes, without touching the backend."""
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(user_id)
+            return True, entry[1]
+        
+        language = self._pending.get(user_id)
+        if language is not None:
+            self._remember(user_id, language)
+            return True, language
+        return False, None
+    
+    def _read_backend(self, user_id: int) -> Tuple[bool, Optional[str]]:
+        """(read ok, language) straight from the backend; safe to call from a worker thread."""
+        try:
+            return True, self.backend.get_language(user_id)
+        except Exception as e:
+            print(f"⚠️ خطأ في قراءة التفضيلات: {e}")
+            print(f"⚠️ Error reading preferences: {e}")
+            return False, None
+    
     def get_user_language(self, user_id: int) -> str:
-        """Get user's preferred language or default."""
-        return self.user_languages.get(user_id, DEFAULT_LANGUAGE)
+        """Get user's preferred language or default. May block on the backend; async code uses get_user_languages."""
+        found, language = self._lookup_cached(user_id)
+        if not found:
+            ok, language = self._read_backend(user_id)
+            if not ok:
+                return DEFAULT_LANGUAGE
+            # Remember misses too so users without a preference don't hit the backend each time
+            self._remember(user_id, language)
+        return language or DEFAULT_LANGUAGE
+    
+    async def get_user_languages(self, user_ids: List[int]) -> Dict[int, str]:
+        """
+        Get several users' preferred languages without blocking the event loop.
+        Users outside the hot set are read from the backend together in one worker thread.
+        """
+        languages: Dict[int, str] = {}
+        missing = []
+        for user_id in user_ids:
+            found, language = self._lookup_cached(user_id)
+            if found:
+                languages[user_id] = language or DEFAULT_LANGUAGE
+            else:
+                missing.append(user_id)
+        
+        if missing:
+            loaded = await asyncio.to_thread(lambda: [self._read_backend(user_id) for user_id in missing])
+            for user_id, (ok, language) in zip(missing, loaded):
+                # A preference set while we were reading wins over what was read
+                found, current = self._lookup_cached(user_id)
+                if found:
+                    language = current
+                elif ok:
+                    self._remember(user_id, language)
+                languages[user_id] = language or DEFAULT_LANGUAGE
+        return languages
+    
+    async def get_user_language_async(self, user_id: int) -> str:
+        """Get user's preferred language or default without blocking the event loop."""
+        return (await self.get_user_languages([user_id]))[user_id]
+    
+    def buttons_enabled(self, user_id: int) -> bool:
+        """Check whether translation buttons should be added under a user's messages."""
+        return user_id not in self._buttons_disabled
+    
+    def set_buttons_enabled(self, user_id: int, enabled: bool):
+        """Turn translation buttons on or off for a user; saved in the background."""
+        with self._lock:
+            if enabled:
+                self._buttons_disabled.discard(user_id)
+            else:
+                self._buttons_disabled.add(user_id)
+            self._pending_buttons[user_id] = not enabled
+        self._wake.set()
     
     def get_language_name(self, language_code: str) -> str:
         """Get the display name for a language code."""
@@ -71,4 +212,4 @@ class LanguageManager:
     
     def get_user_count(self) -> int:
         """Get the number of users with language preferences set."""
-        return len(self.user_languages)
+        return self.backend.count()
@@ -0,0 +1,217 @@
+"""Storage backends for user preferences."""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from config import PREFERENCES_BACKEND, PREFERENCES_DB_PATH, PREFERENCES_JSON_PATH, BUTTON_SETTINGS_JSON_PATH
+
+
+class PreferenceBackend:
+    """Interface every user preference backend implements.
+
+    Backends may be called from the event loop (single-row reads) and from the
+    preference writer thread (batched writes), so implementations must be thread-safe.
+    """
+
+    def get_language(self, user_id: int) -> Optional[str]:
+        """Get a user's stored language, or None if they never set one."""
+        raise NotImplementedError
+
+    def set_languages(self, changes: Dict[int, str]):
+        """Store several users' languages in one batch."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Get the number of users with a stored language."""
+        raise NotImplementedError
+
+    def load_buttons_disabled(self) -> Set[int]:
+        """Get every user who turned translation buttons off (buttons are on by default)."""
+        raise NotImplementedError
+
+    def set_buttons_disabled(self, changes: Dict[int, bool]):
+        """Store several users' button opt-outs in one batch; True means buttons off."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+class JsonPreferenceBackend(PreferenceBackend):
+    """Legacy backend: the whole map lives in memory and in one JSON file."""
+
+    def __init__(self, path: str = PREFERENCES_JSON_PATH, buttons_path: str = BUTTON_SETTINGS_JSON_PATH):
+        self.path = path
+        self.buttons_path = buttons_path
+        self._lock = threading.Lock()
+        self._languages: Dict[int, str] = load_json_preferences(path)
+        self._buttons_disabled: Set[int] = set()
+        try:
+            if os.path.exists(buttons_path):
+                with open(buttons_path, 'r', encoding='utf-8') as f:
+                    self._buttons_disabled = set(json.load(f))
+        except Exception as e:
+            print(f"⚠️ خطأ في تحميل إعدادات الأزرار: {e}")
+            print(f"⚠️ Error loading button settings: {e}")
+
+    def get_language(self, user_id: int) -> Optional[str]:
+        return self._languages.get(user_id)
+
+    def set_languages(self, changes: Dict[int, str]):
+        with self._lock:
+            self._languages.update(changes)
+            # Convert integer keys to strings for JSON serialization
+            data = {str(k): v for k, v in self._languages.items()}
+        write_json_atomically(self.path, data)
+
+    def count(self) -> int:
+        return len(self._languages)
+
+    def load_buttons_disabled(self) -> Set[int]:
+        return set(self._buttons_disabled)
+
+    def set_buttons_disabled(self, changes: Dict[int, bool]):
+        with self._lock:
+            for user_id, disabled in changes.items():
+                if disabled:
+                    self._buttons_disabled.add(user_id)
+                else:
+                    self._buttons_disabled.discard(user_id)
+            data = sorted(self._buttons_disabled)
+        write_json_atomically(self.buttons_path, data)
+
+
+class SqlitePreferenceBackend(PreferenceBackend):
+    """Embedded SQLite backend; rows are read on demand and safe to share between processes."""
+
+    def __init__(self, path: str = PREFERENCES_DB_PATH, import_from: Optional[str] = PREFERENCES_JSON_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS user_languages (
+                user_id INTEGER PRIMARY KEY,
+                language TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            -- Row count kept up to date by triggers so counting users is O(1)
+            CREATE TABLE IF NOT EXISTS user_language_count (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                total INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS user_languages_count_insert AFTER INSERT ON user_languages
+            BEGIN
+                UPDATE user_language_count SET total = total + 1 WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS user_languages_count_delete AFTER DELETE ON user_languages
+            BEGIN
+                UPDATE user_language_count SET total = total - 1 WHERE id = 0;
+            END;
+            INSERT OR IGNORE INTO user_language_count (id, total)
+                SELECT 0, COUNT(*) FROM user_languages;
+            -- Buttons are on by default, so only opt-outs are stored
+            CREATE TABLE IF NOT EXISTS buttons_disabled (
+                user_id INTEGER PRIMARY KEY
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+        if import_from and self.count() == 0 and os.path.exists(import_from):
+            self._import_json(import_from)
+
+    def _import_json(self, path: str):
+        """One-time migration from the legacy JSON file."""
+        languages = load_json_preferences(path)
+        if languages:
+            self.set_languages(languages)
+            print(f"📦 تم نقل تفضيلات {len(languages)} مستخدم إلى SQLite")
+            print(f"📦 Migrated preferences for {len(languages)} users to SQLite")
+
+    def get_language(self, user_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT language FROM user_languages WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_languages(self, changes: Dict[int, str]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO user_languages (user_id, language, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(user_id) DO UPDATE SET language = excluded.language, updated_at = excluded.updated_at",
+                [(user_id, language, now) for user_id, language in changes.items()]
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT total FROM user_language_count WHERE id = 0").fetchone()[0]
+
+    def load_buttons_disabled(self) -> Set[int]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT user_id FROM buttons_disabled")}
+
+    def set_buttons_disabled(self, changes: Dict[int, bool]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO buttons_disabled (user_id) VALUES (?)",
+                [(user_id,) for user_id, disabled in changes.items() if disabled]
+            )
+            self._conn.executemany(
+                "DELETE FROM buttons_disabled WHERE user_id = ?",
+                [(user_id,) for user_id, disabled in changes.items() if not disabled]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def load_json_preferences(path: str) -> Dict[int, str]:
+    """Load a legacy user_id -> language JSON file."""
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Convert string keys back to integers
+            return {int(k): v for k, v in data.items()}
+    except Exception as e:
+        print(f"⚠️ خطأ في تحميل التفضيلات: {e}")
+        print(f"⚠️ Error loading preferences: {e}")
+    return {}
+
+
+def write_json_atomically(path: str, data: dict):
+    """Write JSON to a temp file next to ``path`` and swap it in.
+
+    A crash mid-write never leaves a truncated file behind.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".preferences.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def create_backend(kind: str = PREFERENCES_BACKEND) -> PreferenceBackend:
+    """Build the configured preference backend."""
+    if kind == 'json':
+        return JsonPreferenceBackend()
+    if kind == 'sqlite':
+        return SqlitePreferenceBackend()
+    raise ValueError(f"Unknown preferences backend: {kind}")
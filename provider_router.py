@@ -0,0 +1,177 @@
+"""Adaptive ordering of translation providers with health scoring and circuit breakers."""
+
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    ROUTER_EWMA_ALPHA, ROUTER_FAILURE_THRESHOLD,
+    ROUTER_OPEN_SECONDS, ROUTER_MAX_OPEN_SECONDS, ROUTER_DEFAULT_LATENCY, ROUTER_RECOVERY_SECONDS,
+)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+LanguagePair = Optional[Tuple[str, str]]
+
+
+class PairRejected(Exception):
+    """A provider refused one language pair; says nothing about the provider as a whole."""
+
+
+class ProviderHealth:
+    """Rolling health statistics and circuit breaker state for one provider (and pair)."""
+
+    def __init__(self):
+        self.success_rate = 1.0
+        self.latency = ROUTER_DEFAULT_LATENCY
+        self.consecutive_failures = 0
+        self.recent_errors = deque(maxlen=20)  # timestamps of recent failures
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.open_seconds = ROUTER_OPEN_SECONDS
+        self.probe_in_flight = False
+        self.last_update = time.monotonic()
+
+    def allows_request(self, now: float) -> bool:
+        """Whether a request may be sent; moves an expired open circuit to half-open."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == HALF_OPEN:
+            return not self.probe_in_flight
+        return False
+
+    def record(self, success: bool, latency: float, now: float):
+        """Fold one request outcome into the averages and breaker state."""
+        alpha = ROUTER_EWMA_ALPHA
+        self.success_rate = (1 - alpha) * self.success_rate + alpha * (1.0 if success else 0.0)
+        self.latency = (1 - alpha) * self.latency + alpha * latency
+        self.probe_in_flight = False
+        self.last_update = now
+
+        if success:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.open_seconds = ROUTER_OPEN_SECONDS
+            return
+
+        self.consecutive_failures += 1
+        self.recent_errors.append(now)
+        if self.state == HALF_OPEN:
+            # Probe failed: stay away for longer next time
+            self._open(now, min(self.open_seconds * 2, ROUTER_MAX_OPEN_SECONDS))
+        elif self.consecutive_failures >= ROUTER_FAILURE_THRESHOLD:
+            self._open(now, ROUTER_OPEN_SECONDS)
+
+    def _open(self, now: float, open_seconds: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.open_seconds = open_seconds
+
+    def score(self, now: float) -> float:
+        """Higher is better: expected successes per second of waiting.
+
+        Old failures fade out over ROUTER_RECOVERY_SECONDS so a provider that
+        lost the ranking eventually gets traffic again and can prove it recovered.
+        """
+        decay = math.exp(-(now - self.last_update) / ROUTER_RECOVERY_SECONDS)
+        success_rate = 1.0 - (1.0 - self.success_rate) * decay
+        return success_rate / (1.0 + self.latency)
+
+
+class ProviderRouter:
+    """Chooses the provider order for each language pair from observed health."""
+
+    def __init__(self, providers: List[str]):
+        self.providers = list(providers)
+        self._health: Dict[Tuple[str, LanguagePair], ProviderHealth] = {}
+        self._samples: Dict[str, deque] = {name: deque(maxlen=200) for name in self.providers}
+
+    def _get(self, provider: str, pair: LanguagePair) -> ProviderHealth:
+        health = self._health.get((provider, pair))
+        if health is None:
+            health = self._health[(provider, pair)] = ProviderHealth()
+        return health
+
+    def order(self, source_lang: str, target_lang: str) -> List[str]:
+        """Get the providers to try for a pair, best first, skipping open circuits."""
+        now = time.monotonic()
+        pair = (source_lang, target_lang)
+        available = []
+        for index, name in enumerate(self.providers):
+            overall = self._get(name, None)
+            per_pair = self._get(name, pair)
+            if not (overall.allows_request(now) and per_pair.allows_request(now)):
+                continue
+            # Weight the pair-specific view over the provider-wide one;
+            # the configured order breaks ties
+            score = 0.7 * per_pair.score(now) + 0.3 * overall.score(now)
+            available.append((-score, index, name))
+        return [name for _, _, name in sorted(available)]
+
+    def begin(self, provider: str, source_lang: str, target_lang: str):
+        """Mark a request as started so half-open circuits only let one probe through."""
+        for health in (self._get(provider, None), self._get(provider, (source_lang, target_lang))):
+            if health.state == HALF_OPEN:
+                health.probe_in_flight = True
+
+    def record(self, provider: str, source_lang: str, target_lang: str, success: bool, latency: float,
+               pair_only: bool = False):
+        """Record the outcome of one provider request.
+
+        Failures with ``pair_only`` (the provider rejected this language pair) count
+        against the pair's health only, so one unsupported pair can't open the
+        provider-wide circuit that every other pair relies on.
+        """
+        now = time.monotonic()
+        overall = self._get(provider, None)
+        was_open = overall.state != CLOSED
+        if pair_only:
+            overall.probe_in_flight = False
+        else:
+            overall.record(success, latency, now)
+        self._get(provider, (source_lang, target_lang)).record(success, latency, now)
+        self._samples[provider].append(latency)
+
+        if overall.state == OPEN and not was_open:
+            print(f"🚫 فتح قاطع الدائرة لـ {provider}")
+            print(f"🚫 Circuit opened for {provider}")
+        elif was_open and overall.state == CLOSED:
+            print(f"✅ إغلاق قاطع الدائرة لـ {provider}")
+            print(f"✅ Circuit closed for {provider}")
+
+    def cancel(self, provider: str, source_lang: str, target_lang: str):
+        """Release a half-open probe whose request was cancelled before finishing."""
+        for health in (self._get(provider, None), self._get(provider, (source_lang, target_lang))):
+            health.probe_in_flight = False
+
+    def latency_percentile(self, provider: str, percentile: float) -> Optional[float]:
+        """Get a latency percentile from recent samples, or None without enough data."""
+        samples = self._samples.get(provider)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+    def sample_count(self, provider: str) -> int:
+        """Get the number of recent latency samples for a provider."""
+        return len(self._samples.get(provider, ()))
+
+    def stats(self) -> Dict[str, dict]:
+        """Get provider-wide health for diagnostics."""
+        result = {}
+        for name in self.providers:
+            health = self._get(name, None)
+            result[name] = {
+                'state': health.state,
+                'success_rate': round(health.success_rate, 3),
+                'latency': round(health.latency, 3),
+                'recent_errors': len(health.recent_errors),
+            }
+        return result
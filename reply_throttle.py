@@ -0,0 +1,58 @@
+"""Per-channel token buckets limiting how often the bot posts translation buttons."""
+
+import time
+from typing import Dict
+
+from config import BUTTON_REPLY_BURST, BUTTON_REPLY_RATE
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` tokens, refilled at ``rate`` tokens per second."""
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        """Take a token if one is available."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled completely (and can be forgotten)."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class ChannelReplyThrottle:
+    """Decides per channel whether a message gets its own button reply."""
+
+    def __init__(self, burst: float = BUTTON_REPLY_BURST, rate: float = BUTTON_REPLY_RATE):
+        self.burst = burst
+        self.rate = rate
+        self._buckets: Dict[int, TokenBucket] = {}
+
+    def allow(self, channel_id: int) -> bool:
+        """Take a reply token for the channel; False means the reply should be coalesced."""
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                self._forget_idle()
+            bucket = self._buckets[channel_id] = TokenBucket(self.burst, self.rate)
+        return bucket.try_take()
+
+    def _forget_idle(self):
+        """Drop buckets that have refilled completely; they carry no state worth keeping."""
+        now = time.monotonic()
+        self._buckets = {cid: bucket for cid, bucket in self._buckets.items() if not bucket.is_full(now)}
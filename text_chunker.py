@@ -0,0 +1,104 @@
+"""Linear-time text chunking under a UTF-8 byte budget."""
+
+from typing import List, Union
+
+# Sentence ends, searched for in the UTF-8 bytes. Latin-style terminators count only
+# with a following space (not "3.14" or "example.com"); line breaks, CJK full-width,
+# Arabic question mark/semicolon, Urdu full stop, Devanagari danda, Ethiopic and Myanmar
+# terminators are used without one.
+_ASCII_SENTENCE_MARKS = [b'\n', b'. ', b'! ', b'? ', b'; ', b'.\t', b'!\t', b'?\t']
+_OTHER_SENTENCE_MARKS = [mark.encode('utf-8') for mark in (
+    '… ', '。', '！', '？', '｡', '؟', '؛', '۔', '।', '॥', '።', '፧', '፨', '။', '၊',
+)]
+
+_WHITESPACE = b' \t\r\n'
+
+# The same marks for splitting by characters
+_ASCII_TEXT_MARKS = [mark.decode('utf-8') for mark in _ASCII_SENTENCE_MARKS]
+_OTHER_TEXT_MARKS = [mark.decode('utf-8') for mark in _OTHER_SENTENCE_MARKS]
+_TEXT_WHITESPACE = _WHITESPACE.decode('ascii')
+
+
+def utf8_len(text: str) -> int:
+    """Size of the text in UTF-8 bytes, the unit providers limit requests by."""
+    return len(text.encode('utf-8'))
+
+
+def _find_cut(data: Union[bytes, str], start: int, max_size: int) -> int:
+    """Where the chunk starting at ``start`` should end: the last sentence end in the
+    second half of the budget, else the last space, else the last whole character."""
+    is_bytes = isinstance(data, bytes)
+    whitespace = _WHITESPACE if is_bytes else _TEXT_WHITESPACE
+
+    # Leading whitespace is stripped before sending, so it doesn't count
+    while start < len(data) and data[start] in whitespace:
+        start += 1
+
+    limit = start + max_size
+    if limit >= len(data):
+        return len(data)
+    if is_bytes:
+        # Never cut inside a multi-byte character
+        while limit > start + 1 and (data[limit] & 0xC0) == 0x80:
+            limit -= 1
+
+    half = start + max_size // 2
+    cut = -1
+    marks = _ASCII_SENTENCE_MARKS if is_bytes else _ASCII_TEXT_MARKS
+    if not data[half:limit].isascii():
+        marks = marks + (_OTHER_SENTENCE_MARKS if is_bytes else _OTHER_TEXT_MARKS)
+    for mark in marks:
+        index = data.rfind(mark, half, limit)
+        if index >= 0:
+            cut = max(cut, index + len(mark))
+
+    if cut < 0:
+        index = data.rfind(whitespace[:1], start + 1, limit)
+        cut = index + 1 if index >= 0 else limit
+
+    # Keep the following whitespace with this chunk so line breaks survive rejoining
+    while cut < len(data) and data[cut] in whitespace:
+        cut += 1
+    return cut
+
+
+def _split(data: Union[bytes, str], max_size: int) -> list:
+    pieces = []
+    start = 0
+    while start < len(data):
+        cut = _find_cut(data, start, max_size)
+        pieces.append(data[start:cut])
+        start = cut
+    return pieces
+
+
+def split_by_bytes(text: str, max_bytes: int) -> List[str]:
+    """
+    Pack text into as few chunks as possible, each at most max_bytes of UTF-8 once stripped.
+    Chunks end on sentence boundaries where possible and keep their trailing whitespace,
+    so ''.join(chunks) == text. Each chunk costs O(max_bytes), so the whole split is linear.
+    """
+    data = text.encode('utf-8')
+    if len(data) <= max_bytes:
+        return [text]
+    return [chunk.decode('utf-8') for chunk in _split(data, max_bytes)]
+
+
+def split_by_chars(text: str, max_chars: int) -> List[str]:
+    """Like split_by_bytes, but measured in characters (for display limits such as embed fields)."""
+    if len(text) <= max_chars:
+        return [text]
+    return _split(text, max_chars)
+
+
+def chunk_separator(chunk: str) -> str:
+    """What to put after a chunk's translation when joining them back up."""
+    trailing = chunk[len(chunk.rstrip()):]
+    return '\n' if '\n' in trailing else ' '
+
+
+def join_chunks(chunks: List[str], translations: List[str]) -> str:
+    """Join chunk translations with the line breaks or spaces the original had between chunks."""
+    return ''.join(
+        translated + chunk_separator(chunk) for translated, chunk in zip(translations, chunks)
+    ).strip()
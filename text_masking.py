@@ -0,0 +1,62 @@
+"""Swap untranslatable Discord tokens for compact placeholders and restore them afterwards."""
+
+import re
+from typing import List, Tuple
+
+# Checked left to right; code comes first so nothing inside it is masked separately
+_TOKEN = re.compile(
+    r"```.*?```"                         # code blocks
+    r"|`[^`\n]+`"                        # inline code
+    r"|<a?:\w+:\d+>"                     # custom emoji
+    r"|<(?:@[!&]?|#)\d+>"                # user, role and channel mentions
+    r"|</[\w -]+:\d+>"                   # slash command mentions
+    r"|<t:-?\d+(?::[tTdDfFR])?>"         # timestamps
+    r"|<?https?://[^\s<>]+>?"            # links, including <suppressed embeds>
+    r"|@(?:everyone|here)\b"
+    r"|:[A-Za-z_][\w+-]*:"               # emoji shortcodes (not times like 10:30:45)
+    r"|\{\d+\}",                         # text that already looks like a placeholder
+    re.DOTALL,
+)
+
+# Providers sometimes add spaces inside the braces
+_PLACEHOLDER = re.compile(r"\{\s*(\d+)\s*\}")
+
+
+def mask_text(text: str) -> Tuple[str, List[str]]:
+    """Replace mentions, emoji, links and code with {0}, {1}, ...; returns (masked text, tokens)."""
+    tokens: List[str] = []
+
+    def replace(match: re.Match) -> str:
+        tokens.append(match.group())
+        return f"{{{len(tokens) - 1}}}"
+
+    return _TOKEN.sub(replace, text), tokens
+
+
+def unmask_text(text: str, tokens: List[str], append_missing: bool = True) -> str:
+    """Put the original tokens back; any the provider dropped are appended at the end.
+
+    Pass append_missing=False for partial translations, whose later tokens simply aren't there yet.
+    """
+    if not tokens:
+        return text
+
+    restored = set()
+
+    def replace(match: re.Match) -> str:
+        index = int(match.group(1))
+        if index >= len(tokens):
+            return match.group()
+        restored.add(index)
+        return tokens[index]
+
+    text = _PLACEHOLDER.sub(replace, text)
+    missing = [token for index, token in enumerate(tokens) if index not in restored]
+    if missing and append_missing:
+        text = f"{text} {' '.join(missing)}"
+    return text
+
+
+def has_words(masked: str) -> bool:
+    """Whether anything translatable is left once tokens are masked."""
+    return any(char.isalpha() for char in _PLACEHOLDER.sub('', masked))
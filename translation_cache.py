@@ -0,0 +1,104 @@
+"""In-memory translation result cache with LRU and TTL eviction."""
+
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_TTL
+
+CacheKey = Tuple[str, str, str]
+CacheValue = Tuple[str, str]
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share one cache entry."""
+    text = unicodedata.normalize('NFC', text)
+    # Collapse runs of spaces/tabs on each line but keep line structure
+    lines = [' '.join(line.split()) for line in text.strip().splitlines()]
+    return '\n'.join(lines)
+
+
+def make_key(text: str, source_lang: Optional[str], target_lang: str) -> CacheKey:
+    """Build a cache key from normalized text and the language pair."""
+    return normalize_text(text), source_lang or 'auto', target_lang
+
+
+class TranslationCache:
+    """Bounded LRU cache of translations with per-entry expiry."""
+
+    def __init__(self, max_size: int = TRANSLATION_CACHE_SIZE, ttl: float = TRANSLATION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, CacheValue]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[CacheValue]:
+        """Return the cached (translation, source_lang) or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: CacheKey, value: CacheValue):
+        """Store a translation, evicting the least recently used entries."""
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def contains(self, key: CacheKey) -> bool:
+        """Check for a live entry without touching LRU order or counters."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry and return how many were removed."""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at < now]
+        for key in expired:
+            del self._entries[key]
+        self.evictions += len(expired)
+        return len(expired)
+
+    def clear(self) -> int:
+        """Remove all entries and reset counters. Returns the number removed."""
+        removed = len(self._entries)
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        return removed
+
+    def stats(self) -> dict:
+        """Get hit/miss counters and current size."""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
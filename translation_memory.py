@@ -0,0 +1,99 @@
+"""Sentence-level translation memory: reuse translations of sentences seen before."""
+
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config import TM_SIZE
+
+# A sentence ends at a line break, at Latin-style terminators followed by a space
+# (not "3.14" or "example.com"), or at terminators of scripts written without one
+_SENTENCE_END = re.compile(r'\n\s*|[.!?…]+[ \t]+\s*|[。！？｡؟؛۔।॥።፧፨။]\s*')
+
+Pair = Tuple[str, str]
+
+
+def normalize_segment(text: str) -> str:
+    """Reduce a sentence to its reusable form: only Unicode forms and whitespace are normalized,
+    so case, punctuation and spelling (which can change the meaning) still have to match."""
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, each keeping the whitespace after it, so ''.join(sentences) == text."""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        if match.end() > start and text[start:match.start()].strip():
+            sentences.append(text[start:match.end()])
+            start = match.end()
+    if start < len(text):
+        if sentences and not text[start:].strip():
+            sentences[-1] += text[start:]
+        else:
+            sentences.append(text[start:])
+    return sentences
+
+
+class TranslationMemory:
+    """Bounded in-memory store of translated sentences per language pair.
+
+    Only exact matches (after normalize_segment) are reused: a sentence that differs
+    by one word, number or "not" is sent to the provider, never served another
+    sentence's translation.
+    """
+
+    def __init__(self, max_entries: int = TM_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Pair, str], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Get the stored translation of exactly this sentence."""
+        normalized = normalize_segment(text)
+        if not normalized:
+            return None
+
+        key = ((source_lang, target_lang), normalized)
+        translation = self._entries.get(key)
+        if translation is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return translation
+
+    def add(self, text: str, source_lang: str, target_lang: str, translation: str):
+        """Remember a sentence's translation."""
+        if self.max_entries <= 0:
+            return
+        normalized = normalize_segment(text)
+        if not normalized:
+            return
+
+        key = ((source_lang, target_lang), normalized)
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> int:
+        """Forget every sentence. Returns the number removed."""
+        removed = len(self._entries)
+        self._entries.clear()
+        return removed
+
+    def stats(self) -> dict:
+        """Get hit counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,203 @@
+"""Priority scheduler for translation jobs with per-user fairness and load shedding."""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+from config import (
+    SCHEDULER_WORKERS, SCHEDULER_RESERVED_WORKERS, SCHEDULER_QUEUE_LIMITS, SCHEDULER_MAX_QUEUED_PER_USER,
+    SCHEDULER_DEFAULT_SERVICE_TIME, SCHEDULER_EWMA_ALPHA,
+)
+
+# Lower numbers run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_SPECULATIVE = 2
+PRIORITY_NAMES = ('interactive', 'bulk', 'speculative')
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when a job is shed because the queue is too deep for its priority."""
+
+    def __init__(self, priority: int, retry_after: float):
+        super().__init__(f"Translation queue is full for {PRIORITY_NAMES[priority]} work")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class _Job:
+    __slots__ = ('key', 'factory', 'priority', 'user_id', 'future', 'task')
+
+    def __init__(self, key: Hashable, factory: Callable[[], Awaitable], priority: int, user_id: Optional[int]):
+        self.key = key
+        self.factory = factory
+        self.priority = priority
+        self.user_id = user_id
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+
+
+class TranslationScheduler:
+    """Runs translation jobs on a bounded number of slots, highest priority first.
+
+    Within a priority, users take turns (round robin) so a few heavy users cannot
+    starve everyone else. SCHEDULER_RESERVED_WORKERS slots are kept for interactive
+    jobs, and new jobs are shed once the queue passes their priority's limit.
+    """
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS, reserved: int = SCHEDULER_RESERVED_WORKERS):
+        self.workers = workers
+        self.reserved = min(reserved, workers - 1)
+        # priority -> user_id -> queued jobs; the OrderedDict order is the round-robin turn order
+        self._queues: List["OrderedDict[Optional[int], deque]"] = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._queued_jobs: Dict[Hashable, _Job] = {}
+        self._running: Set[_Job] = set()
+        self.service_time = SCHEDULER_DEFAULT_SERVICE_TIME
+        self.completed = 0
+        self.shed = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable], priority: int = PRIORITY_INTERACTIVE,
+                  user_id: Optional[int] = None):
+        """Queue ``factory()`` and return its result once a slot has run it.
+
+        ``key`` identifies the job for promote() and estimate_wait(). Callers coalesce
+        duplicates before scheduling; if two queued jobs do share a key, those lookups see the newer one.
+        """
+        job = _Job(key, factory, priority, user_id)
+        if not self._can_start(priority) or self._queued_jobs:
+            self._check_capacity(job)
+        self._enqueue(job)
+        self._dispatch()
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            self._discard(job)
+            raise
+
+    def promote(self, key: Hashable, priority: int):
+        """Move a queued job up to ``priority`` (a click joining a queued prefetch, say)."""
+        job = self._queued_jobs.get(key)
+        if job is None or job.priority <= priority:
+            return
+        self._remove_queued(job)
+        job.priority = priority
+        self._enqueue(job)
+        self._dispatch()
+
+    def estimate_wait(self, key: Hashable) -> Optional[float]:
+        """Estimated seconds until a queued job starts, or None if it isn't queued."""
+        job = self._queued_jobs.get(key)
+        if job is None:
+            return None
+        return self._jobs_ahead(job) * self.service_time / self.workers
+
+    def estimate_new_wait(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Estimated seconds a job submitted now at ``priority`` would wait to start."""
+        if self._can_start(priority) and not self._queued_jobs:
+            return 0.0
+        ahead = sum(self._queued_count(p) for p in range(priority + 1))
+        return (ahead + 1) * self.service_time / self.workers
+
+    def stats(self) -> dict:
+        """Get queue depths, running jobs and throughput counters."""
+        return {
+            'running': len(self._running),
+            'queued': {name: self._queued_count(p) for p, name in enumerate(PRIORITY_NAMES)},
+            'service_time': round(self.service_time, 3),
+            'completed': self.completed,
+            'shed': self.shed,
+        }
+
+    def _check_capacity(self, job: _Job):
+        """Shed the job if the queue is too deep for its priority or its user."""
+        user_queue = self._queues[job.priority].get(job.user_id)
+        over_user_limit = job.user_id is not None and user_queue is not None and len(user_queue) >= SCHEDULER_MAX_QUEUED_PER_USER
+        if len(self._queued_jobs) >= SCHEDULER_QUEUE_LIMITS[PRIORITY_NAMES[job.priority]] or over_user_limit:
+            self.shed += 1
+            raise SchedulerOverloaded(job.priority, self.estimate_new_wait(job.priority))
+
+    def _can_start(self, priority: int) -> bool:
+        limit = self.workers if priority == PRIORITY_INTERACTIVE else self.workers - self.reserved
+        return len(self._running) < limit
+
+    def _enqueue(self, job: _Job):
+        self._queues[job.priority].setdefault(job.user_id, deque()).append(job)
+        self._queued_jobs[job.key] = job
+
+    def _remove_queued(self, job: _Job):
+        users = self._queues[job.priority]
+        user_queue = users.get(job.user_id)
+        if user_queue is not None and job in user_queue:
+            user_queue.remove(job)
+            if not user_queue:
+                del users[job.user_id]
+        if self._queued_jobs.get(job.key) is job:
+            del self._queued_jobs[job.key]
+
+    def _discard(self, job: _Job):
+        """Forget a job whose caller gave up waiting."""
+        self._remove_queued(job)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+
+    def _queued_count(self, priority: int) -> int:
+        return sum(len(user_queue) for user_queue in self._queues[priority].values())
+
+    def _jobs_ahead(self, job: _Job) -> int:
+        """Queued jobs that will start before ``job`` if nothing else arrives."""
+        ahead = sum(self._queued_count(p) for p in range(job.priority))
+        users = self._queues[job.priority]
+        position = users[job.user_id].index(job)
+        for user_id, user_queue in users.items():
+            if user_id == job.user_id:
+                ahead += position
+            else:
+                ahead += min(len(user_queue), position + 1)
+        return ahead
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the next job to run: highest priority first, users in turn."""
+        for priority, users in enumerate(self._queues):
+            if not users or not self._can_start(priority):
+                continue
+            user_id, user_queue = next(iter(users.items()))
+            job = user_queue.popleft()
+            if user_queue:
+                users.move_to_end(user_id)
+            else:
+                del users[user_id]
+            if self._queued_jobs.get(job.key) is job:
+                del self._queued_jobs[job.key]
+            return job
+        return None
+
+    def _dispatch(self):
+        """Start queued jobs while slots are free."""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._running.add(job)
+            job.task = asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: _Job):
+        started = time.monotonic()
+        try:
+            result = await job.factory()
+        except asyncio.CancelledError:
+            if not job.future.done():
+                job.future.cancel()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._running.discard(job)
+            self.completed += 1
+            elapsed = time.monotonic() - started
+            self.service_time += SCHEDULER_EWMA_ALPHA * (elapsed - self.service_time)
+            self._dispatch()
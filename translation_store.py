@@ -0,0 +1,176 @@
+"""Persistent on-disk translation store backed by SQLite."""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from config import TRANSLATION_STORE_PATH, TRANSLATION_STORE_MAX_BYTES
+from translation_cache import CacheKey, CacheValue
+
+# How many writes to accept between size checks
+EVICTION_CHECK_INTERVAL = 100
+# Evict down to this fraction of the size budget so we don't evict on every write
+EVICTION_TARGET_RATIO = 0.9
+# Seconds before a read refreshes a row's last_access; LRU order only needs to be roughly right
+TOUCH_INTERVAL = 3600
+
+
+class TranslationStore:
+    """Second-tier translation cache shared by every bot process on the host.
+
+    Entries are zlib-compressed and evicted least-recently-used first once the
+    total payload size passes ``max_bytes``; reads refresh the access time at
+    most once per TOUCH_INTERVAL. The database runs in WAL mode so
+    several processes can read and write it concurrently.
+    """
+
+    def __init__(self, path: str = TRANSLATION_STORE_PATH, max_bytes: int = TRANSLATION_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key BLOB PRIMARY KEY,"
+                " source_lang TEXT NOT NULL,"
+                " payload BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_last_access ON translations (last_access)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ تعذر فتح مخزن الترجمات: {e}")
+            print(f"⚠️ Could not open translation store: {e}")
+            self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the on-disk store is usable."""
+        return self._conn is not None
+
+    @staticmethod
+    def _hash_key(key: CacheKey) -> bytes:
+        return hashlib.sha256('\0'.join(key).encode('utf-8')).digest()
+
+    def get_sync(self, key: CacheKey) -> Optional[CacheValue]:
+        """Look up a translation (blocking)."""
+        if not self._conn:
+            return None
+
+        digest = self._hash_key(key)
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT source_lang, payload, last_access FROM translations WHERE key = ?", (digest,)
+                ).fetchone()
+                if row is None:
+                    return None
+                # Most hits stay read-only instead of taking the write lock other processes wait on
+                now = time.time()
+                if now - row[2] >= TOUCH_INTERVAL:
+                    self._conn.execute(
+                        "UPDATE translations SET last_access = ? WHERE key = ?", (now, digest)
+                    )
+                    self._conn.commit()
+            source_lang, payload, _ = row
+            return zlib.decompress(payload).decode('utf-8'), source_lang
+        except (sqlite3.Error, zlib.error) as e:
+            print(f"⚠️ خطأ في قراءة مخزن الترجمات: {e}")
+            print(f"⚠️ Translation store read error: {e}")
+            return None
+
+    def set_sync(self, key: CacheKey, value: CacheValue):
+        """Store a translation (blocking)."""
+        if not self._conn:
+            return
+
+        translated, source_lang = value
+        payload = zlib.compress(translated.encode('utf-8'))
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO translations (key, source_lang, payload, size, last_access)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (self._hash_key(key), source_lang, payload, len(payload), time.time())
+                )
+                self._conn.commit()
+                self._writes_since_check += 1
+                if self._writes_since_check >= EVICTION_CHECK_INTERVAL:
+                    self._writes_since_check = 0
+                    self._evict_locked()
+        except sqlite3.Error as e:
+            print(f"⚠️ خطأ في الكتابة إلى مخزن الترجمات: {e}")
+            print(f"⚠️ Translation store write error: {e}")
+
+    def _evict_locked(self):
+        """Delete least recently used rows until the store fits its budget."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - int(self.max_bytes * EVICTION_TARGET_RATIO)
+        removed = 0
+        cursor = self._conn.execute("SELECT key, size FROM translations ORDER BY last_access")
+        stale_keys = []
+        for digest, size in cursor:
+            stale_keys.append((digest,))
+            removed += size
+            if removed >= excess:
+                break
+
+        self._conn.executemany("DELETE FROM translations WHERE key = ?", stale_keys)
+        self._conn.commit()
+        print(f"🧹 إزالة {len(stale_keys)} ترجمة قديمة من المخزن")
+        print(f"🧹 Evicted {len(stale_keys)} old translations from store")
+
+    def clear_sync(self) -> int:
+        """Delete every stored translation (blocking)."""
+        if not self._conn:
+            return 0
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM translations").rowcount
+            self._conn.commit()
+        return removed
+
+    def count(self) -> int:
+        """Get the number of stored translations."""
+        if not self._conn:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    async def get(self, key: CacheKey) -> Optional[CacheValue]:
+        """Look up a translation without blocking the event loop."""
+        if not self._conn:
+            return None
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def set(self, key: CacheKey, value: CacheValue):
+        """Store a translation without blocking the event loop."""
+        if not self._conn:
+            return
+        await asyncio.to_thread(self.set_sync, key, value)
+
+    def close(self):
+        """Close the database connection."""
+        if self._conn:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
@@ -1,83 +1,274 @@
-"""Translation service using free cloud API - No local storage needed."""
+"""Translation service using free cloud APIs."""
 
 import asyncio
 import aiohttp
 import json
-from typing import Optional, Tuple
-from langdetect import detect, DetectorFactory, LangDetectException
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from langdetect.detector_factory import init_factory
 import re
 from urllib.parse import quote
 
-# Set seed for consistent language detection
-DetectorFactory.seed = 0
+from text_chunker import join_chunks, split_by_bytes, utf8_len
+from text_masking import has_words, mask_text, unmask_text
+from translation_cache import CacheKey, TranslationCache, make_key
+from translation_store import TranslationStore
+from translation_memory import TranslationMemory, split_sentences
+from provider_router import PairRejected, ProviderRouter
+from language_detector import AuthorLanguageProfiles, LanguageDetector
+from reply_throttle import TokenBucket
+from translation_scheduler import (
+    TranslationScheduler, SchedulerOverloaded, PRIORITY_INTERACTIVE, PRIORITY_BULK, PRIORITY_SPECULATIVE,
+)
+from config import (
+    CHUNK_CONCURRENCY, GLOBAL_CHUNK_CONCURRENCY, BATCH_DELIMITER,
+    HEDGE_ENABLED, HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HEDGE_MAX_DELAY, HEDGE_MIN_SAMPLES,
+    TRANSLATION_PROVIDERS, PROVIDER_MAX_BYTES,
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, PROVIDER_TIMEOUTS,
+    DETECTION_WORKERS, PIVOT_ROUTE_TTL, PIVOT_ROUTE_FAILURES,
+    PREFETCH_ENABLED, PREFETCH_MAX_LANGUAGES, PREFETCH_BUDGET_PER_MINUTE, PREFETCH_CONCURRENCY,
+)
+
+# langdetect loads its profiles lazily into a global; serialize that first load
+_detector_init_lock = threading.Lock()
+
+def _init_detector():
+    """Load langdetect profiles once per detection worker thread."""
+    with _detector_init_lock:
+        init_factory()
+
+# Splits a packed translation back apart, tolerating spaces providers add around the delimiter
+_BATCH_SPLIT = re.compile(r'\s*' + re.escape(BATCH_DELIMITER) + r'\s*')
+
+class _ChunkProgress:
+    """Finished chunks of one long translation, shared by every caller streaming it."""
+    
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.source_lang: Optional[str] = None
+        self.finished: Dict[int, str] = {}
+        self._changed = asyncio.Event()
+    
+    def start(self, chunks: List[str], source_lang: str):
+        """Begin (or, after a retry in another language, restart) with these chunks."""
+        self.chunks, self.source_lang, self.finished = chunks, source_lang, {}
+        self._notify()
+    
+    def put(self, index: int, translated: str):
+        self.finished[index] = translated
+        self._notify()
+    
+    def _notify(self):
+        # Wake everyone waiting so far; later waiters wait for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def wait(self):
+        """Wait for the next chunk (or restart)."""
+        await self._changed.wait()
+    
+    def ready(self) -> int:
+        """Number of leading chunks finished; only a gap-free prefix can be shown."""
+        ready = 0
+        while ready in self.finished:
+            ready += 1
+        return ready
+    
+    def partial(self, ready: int) -> str:
+        return join_chunks(self.chunks[:ready], [self.finished[i] for i in range(ready)])
+
+# Provider endpoints
+MYMEMORY_URL = "https://api.mymemory.translated.net/get"
+LIBRE_URL = "https://libretranslate.com/translate"
+PROVIDER_URLS = {
+    'mymemory': MYMEMORY_URL,
+    'libre': LIBRE_URL,
+}
 
 class Translator:
     """Handles text translation using free cloud APIs."""
     
     def __init__(self):
         self.session = None
+        self.cache = TranslationCache()
+        self.store = TranslationStore()
+        # Reuses translations of segments that differ only trivially from earlier ones
+        self.memory = TranslationMemory()
+        # Translations currently in progress, shared by identical concurrent requests
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+        # Chunk progress of each in-flight translation, for callers streaming it
+        self._progress: Dict[CacheKey, _ChunkProgress] = {}
+        # English pivots being fetched, shared by every target language waiting on them
+        self._pivot_inflight: Dict[CacheKey, asyncio.Task] = {}
+        # (source, target) -> when a pair last needed the pivot; such pairs skip the direct attempt
+        self._pivot_routes: Dict[Tuple[str, str], float] = {}
+        # (source, target) -> direct attempts in a row that only the pivot could translate
+        self._direct_failures: Dict[Tuple[str, str], int] = {}
+        # Orders uncached translation jobs by priority and user, shedding load when too deep
+        self.scheduler = TranslationScheduler()
+        # Bounds chunk translations running at once across all requests
+        self._chunk_slots = asyncio.Semaphore(GLOBAL_CHUNK_CONCURRENCY)
+        # Picks the provider order from observed health; configured order breaks ties
+        self.router = ProviderRouter(TRANSLATION_PROVIDERS)
+        # Any provider may end up serving a chunk (fallback, hedging), so chunks fit the smallest limit
+        self.max_request_bytes = min(PROVIDER_MAX_BYTES[name] for name in TRANSLATION_PROVIDERS)
+        # One SSL context for every pooled connection so TLS state is reused
+        self._ssl_context = ssl.create_default_context()
+        self._timeouts = {
+            name: aiohttp.ClientTimeout(total=total, connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+            for name, total in PROVIDER_TIMEOUTS.items()
+        }
+        # Speculative translations run under their own small budget and concurrency
+        self._prefetch_budget = TokenBucket(PREFETCH_BUDGET_PER_MINUTE, PREFETCH_BUDGET_PER_MINUTE / 60)
+        self._prefetch_slots = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        self.detector = LanguageDetector()
+        self.author_profiles = AuthorLanguageProfiles()
+        # langdetect is CPU-bound, keep it off the event loop
+        self._detect_executor = ThreadPoolExecutor(
+            max_workers=DETECTION_WORKERS,
+            thread_name_prefix="langdetect",
+            initializer=_init_detector,
+        )
         print("🔧 تم تهيئة المترجم السحابي")
         print("🔧 Cloud translator initialized")
     
     async def get_session(self):
-        """Get or create aiohttp session."""
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
+        """Get or create the shared aiohttp session and its tuned connection pool."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                use_dns_cache=True,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ssl=self._ssl_context,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=max(PROVIDER_TIMEOUTS.values()),
+                    connect=HTTP_CONNECT_TIMEOUT,
+                    sock_read=HTTP_READ_TIMEOUT,
+                ),
+            )
         return self.session
     
+    async def warm_up(self):
+        """Open pooled connections to every provider so the first clicks skip DNS and TLS setup."""
+        session = await self.get_session()
+        
+        async def touch(name: str, url: str):
+            try:
+                async with session.head(url, timeout=self._timeouts[name]) as response:
+                    await response.read()
+                return True
+            except Exception as e:
+                print(f"⚠️ تعذر تسخين الاتصال بـ {name}: {e}")
+                print(f"⚠️ Could not warm up connection to {name}: {e}")
+                return False
+        
+        results = await asyncio.gather(*[touch(name, url) for name, url in PROVIDER_URLS.items()])
+        print(f"🔥 تم تسخين {sum(results)}/{len(results)} اتصال")
+        print(f"🔥 Warmed up {sum(results)}/{len(results)} provider connections")
+    
     def detect_language(self, text: str) -> Optional[str]:
         """Detect the language of the input text."""
         try:
-            # Clean text for better detection
-            cleaned_text = re.sub(r'[^\w\s]', ' ', text)
-            cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-            
-            if len(cleaned_text) < 3:
-                return None
-                
-            detected = detect(cleaned_text)
-            return detected
-        except (LangDetectException, Exception):
+            return self.detector.detect(text)
+        except Exception:
             return None
     
+    async def detect_language_async(self, text: str, author_id: Optional[int] = None) -> Optional[str]:
+        """
+        Detect the language of the input text without blocking the event loop.
+        The script fast path runs inline; only ambiguous text goes to langdetect's workers.
+        """
+        language, script = self.detector.detect_fast(text)
+        if not language:
+            loop = asyncio.get_running_loop()
+            try:
+                language = await loop.run_in_executor(self._detect_executor, self.detector.detect_slow, text, script)
+            except Exception:
+                return None
+        
+        self.author_profiles.update(author_id, language, script, text)
+        return language
+    
+    async def _resolve_source_language(self, text: str, author_id: Optional[int]) -> Tuple[Optional[str], bool]:
+        """
+        Get the source language, preferring the author's usual language over langdetect.
+        Returns (language, whether it came from the author's profile).
+        """
+        language, script = self.detector.detect_fast(text)
+        if language:
+            self.author_profiles.update(author_id, language, script, text)
+            return language, False
+        
+        usual_language = self.author_profiles.lookup(author_id, script, text)
+        if usual_language:
+            return usual_language, True
+        
+        return await self.detect_language_async(text, author_id), False
+    
+    async def detect_many(self, texts: List[str]) -> List[Optional[str]]:
+        """Detect the languages of several texts in a single executor job."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._detect_executor, lambda: [self.detect_language(text) for text in texts]
+        )
+    
     async def translate_with_mymemory(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
-        """Translate using MyMemory API (free, no API key required)."""
+        """
+        Translate using MyMemory API (free, no API key required).
+        Returns None only on errors; an answer that leaves the text unchanged is returned as is.
+        Raises PairRejected when MyMemory refuses the language pair itself.
+        """
         try:
             session = await self.get_session()
             
-            # MyMemory API endpoint
-            url = "https://api.mymemory.translated.net/get"
-            
             params = {
                 'q': text,
                 'langpair': f"{source_lang}|{target_lang}"
             }
             
-            async with session.get(url, params=params, timeout=15) as response:
+            async with session.get(MYMEMORY_URL, params=params, timeout=self._timeouts['mymemory']) as response:
                 if response.status == 200:
                     data = await response.json()
-                    if data.get('responseStatus') == 200:
+                    status = str(data.get('responseStatus'))
+                    if status == '200':
                         translated = data.get('responseData', {}).get('translatedText', '')
-                        if translated and translated.lower() != text.lower():
+                        if translated:
                             print(f"✅ ترجمة MyMemory: {text[:30]}... -> {translated[:30]}...")
                             return translated
                     else:
-                        print(f"⚠️ MyMemory responseStatus: {data.get('responseStatus')}")
+                        print(f"⚠️ MyMemory responseStatus: {status}")
+                        # 400/403 here mean an invalid or unsupported langpair; quota (429) and 5xx are provider-wide
+                        if status in ('400', '403'):
+                            raise PairRejected(data.get('responseDetails') or status)
             
             return None
             
+        except PairRejected:
+            raise
         except Exception as e:
             print(f"❌ خطأ في MyMemory API: {e}")
             return None
     
     async def translate_with_libre(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
-        """Translate using LibreTranslate API (backup method)."""
+        """
+        Translate using LibreTranslate API (backup method).
+        Returns None only on errors; an answer that leaves the text unchanged is returned as is.
+        Raises PairRejected when LibreTranslate refuses the language pair itself.
+        """
         try:
             session = await self.get_session()
             
-            # Use Google Translate alternative API
-            url = "https://libretranslate.com/translate"
-            
             data = {
                 'q': text,
                 'source': source_lang,
@@ -85,146 +276,654 @@ class Translator:
                 'format': 'text'
             }
             
-            async with session.post(url, json=data, timeout=10) as response:
+            async with session.post(LIBRE_URL, json=data, timeout=self._timeouts['libre']) as response:
                 if response.status == 200:
                     result = await response.json()
                     translated = result.get('translatedText', '')
-                    if translated and translated.lower() != text.lower():
+                    if translated:
                         return translated
+                elif response.status == 400:
+                    # Unsupported source or target language; 403 (API key), 429 and 5xx are provider-wide
+                    raise PairRejected(f"HTTP 400 for {source_lang}->{target_lang}")
             
             return None
             
+        except PairRejected:
+            raise
         except Exception as e:
             print(f"❌ خطأ في LibreTranslate API: {e}")
             return None
     
-    async def split_text_smartly(self, text: str, max_length: int = 400) -> list:
-        """Split text intelligently by sentences and paragraphs."""
-        if len(text) <= max_length:
-            return [text]
+    async def split_text_smartly(self, text: str, max_bytes: Optional[int] = None) -> list:
+        """Split text at sentence boundaries into chunks that fit the provider byte limit."""
+        return split_by_bytes(text, max_bytes or self.max_request_bytes)
+    
+    async def translate_text(self, text: str, target_lang: str, source_lang: Optional[str] = None,
+                             author_id: Optional[int] = None, priority: int = PRIORITY_INTERACTIVE,
+                             user_id: Optional[int] = None) -> Tuple[Optional[str], str]:
+        """
+        Translate text to target language, serving repeated requests from cache.
+        When author_id is given, the author's usual language can stand in for detection.
+        Uncached work is queued by priority and by the requesting user_id; raises
+        SchedulerOverloaded when the queue is too deep to accept it.
+        Mentions, emoji, links and code are masked with placeholders, so only the
+        natural-language parts are sent and cached, and restored afterwards.
+        Returns (translated_text, detected_source_language)
+        """
+        masked, tokens = mask_text(text)
+        if tokens and not has_words(masked):
+            return text, source_lang or "unknown"
+        
+        translated, detected_lang = await self._translate_masked(
+            masked, target_lang, source_lang, author_id, priority, user_id
+        )
+        if translated:
+            translated = unmask_text(translated, tokens)
+        return translated, detected_lang
+    
+    async def _translate_masked(self, text: str, target_lang: str, source_lang: Optional[str],
+                                author_id: Optional[int], priority: int, user_id: Optional[int],
+                                resolved: Optional[Tuple[str, bool]] = None) -> Tuple[Optional[str], str]:
+        """Translate already masked text through the cache, single-flight and the scheduler.
+        
+        ``resolved`` is an already resolved (source language, from profile) for a request
+        keyed without a source, so it isn't detected again.
+        """
+        key = make_key(text, source_lang, target_lang)
+        cached = self.cache.get(key)
+        if cached:
+            return cached
+        
+        task, _ = self._start_translation(key, text, target_lang, source_lang, author_id, priority, user_id, resolved)
+        # Shield so one caller being cancelled doesn't cancel it for the others
+        return await asyncio.shield(task)
+    
+    def _start_translation(self, key: CacheKey, text: str, target_lang: str, source_lang: Optional[str],
+                           author_id: Optional[int], priority: int, user_id: Optional[int],
+                           resolved: Optional[Tuple[str, bool]] = None) -> Tuple[asyncio.Task, _ChunkProgress]:
+        """Get the in-flight translation for ``key``, starting it if there is none."""
+        # Coalesce identical concurrent requests onto a single upstream call
+        task = self._inflight.get(key)
+        if task is not None:
+            print(f"🔗 انضمام إلى ترجمة جارية: {text[:30]}...")
+            print(f"🔗 Joining in-flight translation: {text[:30]}...")
+            # A click joining a queued prefetch shouldn't wait at the prefetch's priority
+            self.scheduler.promote(key, priority)
+            return task, self._progress[key]
+        
+        progress = _ChunkProgress()
+        task = asyncio.ensure_future(
+            self._translate_and_store(
+                key, text, target_lang, source_lang, author_id, priority, user_id, progress, resolved
+            )
+        )
+        self._inflight[key] = task
+        self._progress[key] = progress
         
-        chunks = []
-        # Split by paragraphs first
-        paragraphs = text.split('\n')
-        current_chunk = ""
+        def forget(done: asyncio.Task):
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+                del self._progress[key]
         
-        for paragraph in paragraphs:
-            if len(current_chunk + paragraph) <= max_length:
-                current_chunk += paragraph + "\n"
+        task.add_done_callback(forget)
+        return task, progress
+    
+    async def translate_stream(self, text: str, target_lang: str, author_id: Optional[int] = None,
+                               priority: int = PRIORITY_INTERACTIVE,
+                               user_id: Optional[int] = None) -> AsyncIterator[Tuple[Optional[str], str, bool]]:
+        """
+        Translate text, yielding (translation_so_far, source_language, complete) as the leading
+        chunks of a long text finish, so callers can show the start before the rest is done.
+        The last item is the complete translation. Short and cached texts yield once.
+        Concurrent callers share one in-flight translation and all see its progress.
+        Raises SchedulerOverloaded like translate_text.
+        """
+        masked, tokens = mask_text(text)
+        if tokens and not has_words(masked):
+            yield text, "unknown", True
+            return
+        
+        key = make_key(masked, None, target_lang)
+        result = self.cache.get(key)
+        if not result:
+            task, progress = self._start_translation(key, masked, target_lang, None, author_id, priority, user_id)
+            shown = 0
+            while True:
+                ready = progress.ready()
+                if ready != shown and 0 < ready < len(progress.chunks) and not task.done():
+                    shown = ready
+                    yield unmask_text(progress.partial(ready), tokens, append_missing=False), progress.source_lang, False
+                    continue  # More may have finished while the caller handled that one
+                if task.done():
+                    break
+                
+                changed = asyncio.ensure_future(progress.wait())
+                try:
+                    # Waiting doesn't cancel the shared task if this caller goes away
+                    await asyncio.wait({changed, task}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    changed.cancel()
+            result = task.result()  # Re-raises shedding and errors
+        
+        translated, source_lang = result
+        yield (unmask_text(translated, tokens) if translated else translated), source_lang, True
+    
+    def estimate_wait(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> Optional[float]:
+        """Estimated seconds until a queued translation starts, or None if it isn't queued."""
+        return self.scheduler.estimate_wait(make_key(mask_text(text)[0], source_lang, target_lang))
+    
+    async def prefetch(self, text: str, target_langs: List[str], author_id: Optional[int] = None) -> int:
+        """
+        Translate text into several languages in the background so later clicks hit the cache.
+        Runs at low priority: skipped while providers are busy and capped by PREFETCH_BUDGET_PER_MINUTE.
+        Returns the number of translations fetched.
+        """
+        if not PREFETCH_ENABLED or not target_langs:
+            return 0
+        
+        masked, tokens = mask_text(text)
+        if tokens and not has_words(masked):
+            return 0
+        # Resolved once for every target, so the author's profile counts one use, not one per language
+        resolved = await self._resolve_source_language(masked, author_id)
+        source_lang = resolved[0]
+        if not source_lang:
+            return 0
+        
+        fetched = 0
+        for target_lang in target_langs[:PREFETCH_MAX_LANGUAGES]:
+            key = make_key(masked, None, target_lang)
+            if target_lang == source_lang or self.cache.contains(key) or key in self._inflight:
+                continue
+            # Interactive work comes first; speculative work only uses spare capacity
+            if self._chunk_slots.locked() or not self._prefetch_budget.try_take():
+                break
+            
+            try:
+                async with self._prefetch_slots:
+                    # Keyed without a source like clicks are, so they find the result
+                    translated, _ = await self._translate_masked(
+                        masked, target_lang, None, author_id, PRIORITY_SPECULATIVE, None, resolved
+                    )
+            except SchedulerOverloaded:
+                break
+            if translated:
+                fetched += 1
+        
+        if fetched:
+            print(f"🔮 ترجمة مسبقة إلى {fetched} لغة")
+            print(f"🔮 Prefetched translations into {fetched} languages")
+        return fetched
+    
+    async def translate_many(self, texts: List[str], target_lang: str,
+                             author_ids: Optional[List[Optional[int]]] = None, priority: int = PRIORITY_BULK,
+                             user_id: Optional[int] = None) -> List[Tuple[Optional[str], str]]:
+        """
+        Translate several texts, packing short ones that share a source language into
+        as few provider requests as the provider byte limit allows. Texts that don't pack, or
+        whose packed result can't be split back apart, are translated one by one in parallel.
+        Returns a (translated_text, detected_source_language) pair per text, in order.
+        Raises SchedulerOverloaded like translate_text.
+        """
+        if author_ids is None:
+            author_ids = [None] * len(texts)
+        results: List[Optional[Tuple[Optional[str], str]]] = [None] * len(texts)
+        
+        # Work on masked texts throughout; tokens go back in at the end
+        masked_texts = [mask_text(text) for text in texts]
+        texts = [masked for masked, _ in masked_texts]
+        
+        # Cached or stored texts need no request at all
+        misses = []
+        for i, text in enumerate(texts):
+            if masked_texts[i][1] and not has_words(text):
+                results[i] = (text, "unknown")
+                continue
+            key = make_key(text, None, target_lang)
+            cached = self.cache.get(key) or await self.store.get(key)
+            if cached:
+                self.cache.set(key, cached)
+                results[i] = cached
+            elif key in self._inflight or BATCH_DELIMITER in text or utf8_len(text) > self.max_request_bytes // 2:
+                continue  # Join the running request, or too awkward to pack: translate on its own
             else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = paragraph + "\n"
-                else:
-                    # If single paragraph is too long, split by sentences
-                    sentences = paragraph.split('. ')
-                    for sentence in sentences:
-                        if len(current_chunk + sentence) <= max_length:
-                            current_chunk += sentence + ". "
-                        else:
-                            if current_chunk:
-                                chunks.append(current_chunk.strip())
-                            current_chunk = sentence + ". "
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        return chunks
-
-    async def translate_text(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> Tuple[Optional[str], str]:
+                misses.append(i)
+        
+        # Group packable texts by source language
+        sources = await asyncio.gather(*[self._resolve_source_language(texts[i], author_ids[i]) for i in misses])
+        groups: Dict[str, List[int]] = {}
+        for i, (source_lang, _) in zip(misses, sources):
+            if source_lang and source_lang != target_lang and source_lang != 'he' and target_lang != 'he':
+                groups.setdefault(source_lang, []).append(i)
+        
+        packs = []
+        for source_lang, indices in groups.items():
+            pack: List[int] = []
+            size = 0
+            for i in indices:
+                added = utf8_len(texts[i]) + len(BATCH_DELIMITER) + 2
+                if pack and size + added > self.max_request_bytes:
+                    packs.append((source_lang, pack))
+                    pack, size = [], 0
+                pack.append(i)
+                size += added
+            packs.append((source_lang, pack))
+        
+        packed_results = await asyncio.gather(*[
+            self._translate_pack(texts, pack, source_lang, target_lang, priority, user_id)
+            for source_lang, pack in packs if len(pack) > 1
+        ])
+        for translated in packed_results:
+            for i, value in translated.items():
+                results[i] = value
+        
+        # Everything else goes through the regular single-text path
+        singles = [i for i, value in enumerate(results) if value is None]
+        single_results = await asyncio.gather(*[
+            self._translate_masked(texts[i], target_lang, None, author_ids[i], priority, user_id)
+            for i in singles
+        ])
+        for i, value in zip(singles, single_results):
+            results[i] = value
+        
+        return [
+            (unmask_text(translated, tokens) if translated and tokens else translated, source_lang)
+            for (translated, source_lang), (_, tokens) in zip(results, masked_texts)
+        ]
+    
+    async def _translate_pack(self, texts: List[str], indices: List[int], source_lang: str, target_lang: str,
+                              priority: int, user_id: Optional[int]) -> Dict[int, Tuple[str, str]]:
+        """Translate several texts in one provider request and cache each one. Returns index -> result."""
+        packed = f"\n{BATCH_DELIMITER}\n".join(texts[i].strip() for i in indices)
+        keys = [make_key(texts[i], None, target_lang) for i in indices]
+        
+        try:
+            translated = await self.scheduler.run(
+                ('pack', source_lang, tuple(keys)),
+                lambda: self._translate_chunk(packed, source_lang, target_lang, use_memory=False),
+                priority,
+                user_id,
+            )
+        except SchedulerOverloaded:
+            raise  # Falling back to one request per text would only add to the load being shed
+        except Exception as e:
+            print(f"⚠️ فشلت الترجمة المجمعة: {e}")
+            print(f"⚠️ Packed translation failed: {e}")
+            return {}
+        
+        parts = _BATCH_SPLIT.split(translated.strip()) if translated else []
+        if len(parts) != len(indices) or not all(parts):
+            print(f"⚠️ تعذر تقسيم الترجمة المجمعة ({len(parts)}/{len(indices)}) - ترجمة فردية")
+            print(f"⚠️ Couldn't split packed translation ({len(parts)}/{len(indices)}) - translating one by one")
+            return {}
+        
+        print(f"📦 ترجمة {len(indices)} نصوص في طلب واحد")
+        print(f"📦 Translated {len(indices)} texts in one request")
+        results = {}
+        for i, key, part in zip(indices, keys, parts):
+            results[i] = (part, source_lang)
+            self.cache.set(key, results[i])
+            await self.store.set(key, results[i])
+            self.memory.add(texts[i].strip(), source_lang, target_lang, part)
+        return results
+    
+    async def _translate_and_store(self, key: CacheKey, text: str, target_lang: str, source_lang: Optional[str],
+                                   author_id: Optional[int], priority: int, user_id: Optional[int],
+                                   progress: Optional[_ChunkProgress] = None,
+                                   resolved: Optional[Tuple[str, bool]] = None) -> Tuple[Optional[str], str]:
+        """Resolve a cache miss from the persistent store or a scheduled cloud API job."""
+        stored = await self.store.get(key)
+        if stored:
+            self.cache.set(key, stored)
+            return stored
+        
+        translated, detected_lang, complete = await self.scheduler.run(
+            key,
+            lambda: self._translate_uncached(text, target_lang, source_lang, author_id, progress, resolved),
+            priority,
+            user_id,
+        )
+        # A long text with untranslated chunks is shown but not kept, so a later request retries it
+        if translated and complete:
+            self.cache.set(key, (translated, detected_lang))
+            await self.store.set(key, (translated, detected_lang))
+        return translated, detected_lang
+    
+    async def _translate_uncached(self, text: str, target_lang: str, source_lang: Optional[str] = None,
+                                  author_id: Optional[int] = None,
+                                  progress: Optional[_ChunkProgress] = None,
+                                  resolved: Optional[Tuple[str, bool]] = None) -> Tuple[Optional[str], str, bool]:
         """
-        Translate text to target language using cloud APIs with smart text splitting.
-        Returns (translated_text, detected_source_language)
+        Translate text using cloud APIs with smart text splitting.
+        Finished chunks of a long text are reported to ``progress``; ``resolved`` skips detection.
+        Returns (translated_text, source_language, whether every chunk was translated).
         """
         try:
             # Detect source language if not provided
             if not source_lang:
-                source_lang = self.detect_language(text)
+                source_lang, from_profile = resolved or await self._resolve_source_language(text, author_id)
                 if not source_lang:
-                    return None, "unknown"
+                    return None, "unknown", True
+                
+                if from_profile:
+                    translated, _, complete = await self._translate_uncached(
+                        text, target_lang, source_lang, progress=progress
+                    )
+                    if translated:
+                        return translated, source_lang, complete
+                    
+                    # The author's usual language may be wrong for this message: detect and retry
+                    detected = await self.detect_language_async(text, author_id)
+                    if not detected or detected == source_lang:
+                        return None, source_lang, True
+                    source_lang = detected
             
             # Skip translation if source and target are the same
             if source_lang == target_lang:
-                return text, source_lang
+                return text, source_lang, True
             
             # Skip if source is Hebrew (not supported by user requirement)
             if source_lang == 'he' or target_lang == 'he':
-                return None, source_lang
+                return None, source_lang, True
             
             # Handle long texts by splitting
-            if len(text) > 400:
-                print(f"📝 نص طويل ({len(text)} حرف) - تقسيم للترجمة...")
-                print(f"📝 Long text ({len(text)} chars) - splitting for translation...")
-                
-                chunks = await self.split_text_smartly(text, 400)
-                translated_chunks = []
+            if utf8_len(text) > self.max_request_bytes:
+                print(f"📝 نص طويل ({utf8_len(text)} بايت) - تقسيم للترجمة...")
+                print(f"📝 Long text ({utf8_len(text)} bytes) - splitting for translation...")
                 
-                for i, chunk in enumerate(chunks):
-                    print(f"🔄 ترجمة جزء {i+1}/{len(chunks)}: {chunk[:50]}...")
-                    
-                    # Try MyMemory first
-                    translated_chunk = await self.translate_with_mymemory(chunk, source_lang, target_lang)
-                    
-                    if not translated_chunk:
-                        # Try LibreTranslate as backup
-                        translated_chunk = await self.translate_with_libre(chunk, source_lang, target_lang)
-                    
-                    if not translated_chunk:
-                        # Try through English
-                        if source_lang != 'en' and target_lang != 'en':
-                            en_text = await self.translate_with_mymemory(chunk, source_lang, 'en')
-                            if en_text:
-                                translated_chunk = await self.translate_with_mymemory(en_text, 'en', target_lang)
-                    
-                    if translated_chunk:
-                        translated_chunks.append(translated_chunk)
-                    else:
-                        # If chunk translation fails, keep original
-                        translated_chunks.append(chunk)
-                        print(f"⚠️ فشل في ترجمة الجزء {i+1}, استخدام النص الأصلي")
+                chunks = await self.split_text_smartly(text)
                 
-                final_translation = "\n".join(translated_chunks)
+                translated_chunks, failed = await self._translate_chunks(chunks, source_lang, target_lang, progress)
+                if failed == len(chunks):
+                    # Nothing was translated; the original text is no translation
+                    return None, source_lang, False
+                final_translation = join_chunks(chunks, translated_chunks)
                 print(f"✅ اكتملت ترجمة النص الطويل: {len(final_translation)} حرف")
-                return final_translation, source_lang
+                return final_translation, source_lang, failed == 0
             
             # Handle short texts normally
-            translated = await self.translate_with_mymemory(text, source_lang, target_lang)
-            
-            if not translated:
-                translated = await self.translate_with_libre(text, source_lang, target_lang)
-            
-            if not translated:
-                # Try through English for short texts
-                if source_lang != 'en' and target_lang != 'en':
-                    en_text = await self.translate_with_mymemory(text, source_lang, 'en')
-                    if not en_text:
-                        en_text = await self.translate_with_libre(text, source_lang, 'en')
-                    
-                    if en_text:
-                        final_text = await self.translate_with_mymemory(en_text, 'en', target_lang)
-                        if not final_text:
-                            final_text = await self.translate_with_libre(en_text, 'en', target_lang)
-                        
-                        if final_text:
-                            return final_text, source_lang
-            
-            if translated:
-                return translated, source_lang
-            else:
-                return None, source_lang
+            translated = await self._translate_chunk(text, source_lang, target_lang)
+            return translated, source_lang, True
             
         except Exception as e:
             print(f"❌ خطأ في الترجمة: {e}")
             print(f"❌ Translation error: {e}")
-            return None, source_lang or "unknown"
+            return None, source_lang or "unknown", True
+    
+    async def _translate_chunks(self, chunks: List[str], source_lang: str, target_lang: str,
+                                progress: Optional[_ChunkProgress] = None) -> Tuple[List[str], int]:
+        """
+        Translate the chunks of a long text concurrently, in the original order.
+        Chunks that fail keep their original text. Each translated chunk is also reported
+        to ``progress``. Returns (translations, number of chunks that failed).
+        """
+        request_slots = asyncio.Semaphore(CHUNK_CONCURRENCY)
+        if progress is not None:
+            progress.start(chunks, source_lang)
+        
+        async def translate_one(index: int, chunk: str) -> Optional[str]:
+            translated = await self._translate_chunk_limited(
+                request_slots, index, len(chunks), chunk.strip(), source_lang, target_lang
+            )
+            if progress is not None and translated:
+                progress.put(index, translated)
+            return translated
+        
+        # Earlier chunks get the request slots first, so the translation fills in from the top
+        results = await asyncio.gather(*[translate_one(i, chunk) for i, chunk in enumerate(chunks)])
+        translations = [translated or chunk.strip() for translated, chunk in zip(results, chunks)]
+        return translations, sum(translated is None for translated in results)
+    
+    async def _translate_chunk_limited(self, request_slots: asyncio.Semaphore, index: int, total: int,
+                                       chunk: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Translate one chunk of a long text under the per-request and global limits; None if it failed."""
+        async with request_slots, self._chunk_slots:
+            print(f"🔄 ترجمة جزء {index+1}/{total}: {chunk[:50]}...")
+            translated_chunk = await self._translate_chunk(chunk, source_lang, target_lang)
+        
+        if translated_chunk:
+            return translated_chunk
+        
+        # If chunk translation fails, keep original
+        print(f"⚠️ فشل في ترجمة الجزء {index+1}, استخدام النص الأصلي")
+        return None
+    
+    async def _translate_chunk(self, chunk: str, source_lang: str, target_lang: str,
+                               use_memory: bool = True) -> Optional[str]:
+        """
+        Translate a single chunk, reusing remembered translations of its unchanged sentences
+        and sending only the others to the provider, packed into one request.
+        Packed requests pass use_memory=False: their parts are remembered by the caller.
+        """
+        if not use_memory:
+            return await self._translate_segment(chunk, source_lang, target_lang, use_memory=False)
+        
+        sentences = split_sentences(chunk)
+        # Sentences of only mentions, emoji or links pass through as they are
+        translations = [
+            self.memory.lookup(sentence, source_lang, target_lang) if has_words(sentence) else sentence.strip()
+            for sentence in sentences
+        ]
+        missing = [i for i, translated in enumerate(translations) if translated is None]
+        remembered = sum(has_words(sentence) for sentence in sentences) - len(missing)
+        if remembered:
+            print(f"🧠 إعادة استخدام {remembered}/{len(sentences)} جمل مترجمة سابقاً")
+            print(f"🧠 Reusing {remembered}/{len(sentences)} remembered sentences")
+        
+        if missing:
+            fresh = await self._translate_sentences([sentences[i] for i in missing], source_lang, target_lang)
+            if fresh is None:
+                # A sentence alone may come back unchanged ("OK!"); the whole chunk still translates
+                return await self._translate_segment(chunk.strip(), source_lang, target_lang) if len(sentences) > 1 else None
+            for i, translated in zip(missing, fresh):
+                translations[i] = translated
+                self.memory.add(sentences[i], source_lang, target_lang, translated)
+        return join_chunks(sentences, translations)
+    
+    async def _translate_sentences(self, sentences: List[str], source_lang: str,
+                                   target_lang: str) -> Optional[List[str]]:
+        """
+        Translate sentences in one request, split back apart by BATCH_DELIMITER. If the
+        result can't be split, they are translated one by one in parallel instead.
+        Returns a translation per sentence, or None if any of them failed.
+        """
+        sentences = [sentence.strip() for sentence in sentences]
+        if len(sentences) > 1 and not any(BATCH_DELIMITER in sentence for sentence in sentences):
+            packed = f"\n{BATCH_DELIMITER}\n".join(sentences)
+            translated = await self._translate_segment(packed, source_lang, target_lang, use_memory=False)
+            parts = _BATCH_SPLIT.split(translated.strip()) if translated else []
+            if len(parts) == len(sentences) and all(parts):
+                return parts
+            print(f"⚠️ تعذر تقسيم ترجمة الجمل ({len(parts)}/{len(sentences)}) - ترجمة فردية")
+            print(f"⚠️ Couldn't split the sentences' translation ({len(parts)}/{len(sentences)}) - translating one by one")
+        
+        translated = await asyncio.gather(*[
+            self._translate_segment(sentence, source_lang, target_lang) for sentence in sentences
+        ])
+        return None if None in translated else list(translated)
+    
+    async def _translate_segment(self, chunk: str, source_lang: str, target_lang: str,
+                                 use_memory: bool = True) -> Optional[str]:
+        """Translate text directly, or through an English pivot when the pair needs one."""
+        pair = (source_lang, target_lang)
+        pivot_route = self._uses_pivot_route(pair)
+        translated_chunk = None
+        if not pivot_route:
+            translated_chunk = await self._translate_direct(chunk, source_lang, target_lang)
+            if translated_chunk:
+                self._direct_failures.pop(pair, None)
+        
+        if not translated_chunk:
+            # Try through English
+            if source_lang != 'en' and target_lang != 'en':
+                en_text = await self._pivot_to_english(chunk, source_lang, use_memory)
+                if en_text:
+                    translated_chunk = self.memory.lookup(en_text, 'en', target_lang) if use_memory else None
+                    if not translated_chunk:
+                        translated_chunk = await self._translate_direct(en_text, 'en', target_lang)
+                        if translated_chunk and use_memory:
+                            self.memory.add(en_text, 'en', target_lang, translated_chunk)
+                    
+                    if translated_chunk and not pivot_route:
+                        self._record_direct_failure(pair)
+        
+        return translated_chunk
+    
+    def _record_direct_failure(self, pair: Tuple[str, str]):
+        """Count a direct attempt the pivot had to rescue; enough in a row switch the pair to the pivot."""
+        failures = self._direct_failures.get(pair, 0) + 1
+        if failures < PIVOT_ROUTE_FAILURES:
+            # A timeout or a one-off unchanged reply shouldn't cost the pair an hour of double calls
+            self._direct_failures[pair] = failures
+            return
+        
+        del self._direct_failures[pair]
+        print(f"🔀 الزوج {pair[0]}->{pair[1]} يمر عبر الإنجليزية")
+        print(f"🔀 Routing {pair[0]}->{pair[1]} through English")
+        self._pivot_routes[pair] = time.monotonic()
+    
+    def _uses_pivot_route(self, pair: Tuple[str, str]) -> bool:
+        """Whether a pair recently needed the English pivot, so the direct attempt can be skipped."""
+        routed_at = self._pivot_routes.get(pair)
+        if routed_at is None:
+            return False
+        if time.monotonic() - routed_at > PIVOT_ROUTE_TTL:
+            # Retry direct now and then; the providers may have gained the pair
+            del self._pivot_routes[pair]
+            return False
+        return True
+    
+    async def _pivot_to_english(self, chunk: str, source_lang: str, use_memory: bool = True) -> Optional[str]:
+        """Get a chunk's English pivot once and share it across every target language."""
+        remembered = self.memory.lookup(chunk, source_lang, 'en') if use_memory else None
+        if remembered:
+            return remembered
+        
+        key = make_key(chunk, source_lang, 'en')
+        task = self._pivot_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_pivot(key, chunk, source_lang, use_memory))
+            self._pivot_inflight[key] = task
+            task.add_done_callback(lambda done: self._pivot_inflight.pop(key, None) if self._pivot_inflight.get(key) is done else None)
+        return await asyncio.shield(task)
+    
+    async def _fetch_pivot(self, key: CacheKey, chunk: str, source_lang: str, use_memory: bool = True) -> Optional[str]:
+        """Translate a chunk to English, keeping the result in memory and the persistent store."""
+        stored = await self.store.get(key)
+        if stored:
+            en_text = stored[0]
+        else:
+            en_text = await self._translate_direct(chunk, source_lang, 'en')
+            if en_text:
+                await self.store.set(key, (en_text, source_lang))
+        
+        if en_text and use_memory:
+            self.memory.add(chunk, source_lang, 'en', en_text)
+        return en_text
+    
+    async def _call_provider(self, provider: str, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Call one provider and report the outcome to the router. Returns None unless the text changed."""
+        method = getattr(self, f"translate_with_{provider}")
+        self.router.begin(provider, source_lang, target_lang)
+        started = time.monotonic()
+        try:
+            translated = await method(text, source_lang, target_lang)
+        except asyncio.CancelledError:
+            # Losing a hedge race says nothing about the provider's health
+            self.router.cancel(provider, source_lang, target_lang)
+            raise
+        except PairRejected as e:
+            print(f"⚠️ {provider} يرفض الزوج {source_lang}->{target_lang}: {e}")
+            print(f"⚠️ {provider} rejected {source_lang}->{target_lang}: {e}")
+            self.router.record(provider, source_lang, target_lang, False, time.monotonic() - started, pair_only=True)
+            return None
+        # Only errors count against the provider: "ok" or "gg" coming back unchanged is a normal answer
+        self.router.record(provider, source_lang, target_lang, translated is not None, time.monotonic() - started)
+        if translated is not None and translated.lower() == text.lower():
+            return None
+        return translated
+    
+    def get_hedge_delay(self, provider: str) -> float:
+        """Delay before a backup provider is raced: p95 latency of the primary, clamped."""
+        if self.router.sample_count(provider) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        p95 = self.router.latency_percentile(provider, 0.95)
+        return min(max(p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+    
+    async def _translate_direct(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """
+        Translate with the healthiest provider for this pair, hedging with the next one.
+        The backup starts after get_hedge_delay(); the first valid result wins and
+        the other request is cancelled. Remaining providers are tried in order.
+        """
+        providers = self.router.order(source_lang, target_lang)
+        if not providers:
+            print(f"🚫 لا يوجد مزود متاح للزوج {source_lang}->{target_lang}")
+            print(f"🚫 No provider available for {source_lang}->{target_lang}")
+            return None
+        
+        primary_name, backups = providers[0], providers[1:]
+        primary = asyncio.ensure_future(self._call_provider(primary_name, text, source_lang, target_lang))
+        
+        if HEDGE_ENABLED and backups:
+            done, _ = await asyncio.wait({primary}, timeout=self.get_hedge_delay(primary_name))
+            if not done:
+                print(f"⏱️ {primary_name} بطيء - تشغيل {backups[0]} بالتوازي")
+                print(f"⏱️ {primary_name} slow - racing {backups[0]}")
+                backup = asyncio.ensure_future(self._call_provider(backups[0], text, source_lang, target_lang))
+                backups = backups[1:]
+                pending = {primary, backup}
+                try:
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            translated = task.result()
+                            if translated:
+                                return translated
+                finally:
+                    for task in pending:
+                        task.cancel()
+                
+                # Both raced providers failed: plain sequential fallback
+                for name in backups:
+                    translated = await self._call_provider(name, text, source_lang, target_lang)
+                    if translated:
+                        return translated
+                return None
+        
+        translated = await primary
+        for name in backups:
+            if translated:
+                break
+            translated = await self._call_provider(name, text, source_lang, target_lang)
+        return translated
     
     async def close(self):
-        """Close the aiohttp session."""
+        """Close the aiohttp session, the translation store and the detection workers."""
         if self.session:
             await self.session.close()
             self.session = None
+        self.store.close()
+        self._detect_executor.shutdown(wait=False, cancel_futures=True)
     
     def clear_cache(self):
-        """Clear any cached data (no local cache in this implementation)."""
-        print("🧹 لا توجد ذاكرة تخزين محلية للتنظيف")
-        print("🧹 No local cache to clear")
\ No newline at end of file
+        """Clear cached translations from memory and disk."""
+        removed = self.cache.clear() + self.store.clear_sync()
+        self.memory.clear()
+        print(f"🧹 تم مسح {removed} ترجمة من الذاكرة المؤقتة")
+        print(f"🧹 Cleared {removed} cached translations")
+    
+    def get_cache_stats(self) -> dict:
+        """Get translation cache statistics."""
+        stats = self.cache.stats()
+        stats['stored'] = self.store.count()
+        stats['memory'] = self.memory.stats()
+        return stats
+    
+    def get_provider_stats(self) -> dict:
+        """Get provider health and circuit breaker state."""
+        return self.router.stats()
+    
+    def get_queue_stats(self) -> dict:
+        """Get translation queue depths and throughput."""
+        return self.scheduler.stats()